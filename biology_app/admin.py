@@ -3,9 +3,12 @@ from django.contrib import admin
 from django.urls import path
 from django.shortcuts import render, redirect
 from django.contrib import messages
-import pandas as pd
-from .models import BiologyClass, Student, Standard, Test, Question, Score, Comment
+from django.db import transaction
+from .models import BiologyClass, Student, Standard, Test, Question, Score, Comment, ReportJob, StudentAlert, ScheduledTaskRun
 from .forms import StandardUploadForm
+from .catalogue import bump_standards_catalogue
+from .changes import log_class_deletes, log_deletes
+from . import providers
 
 @admin.register(Standard)
 class StandardAdmin(admin.ModelAdmin):
@@ -20,6 +23,19 @@ class StandardAdmin(admin.ModelAdmin):
         ]
         return my_urls + urls
 
+    # Every change to the standards bumps the catalogue version so workers reload it.
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_standards_catalogue()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_standards_catalogue()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_standards_catalogue()
+
     # This is the view that will handle the upload
     def upload_excel(self, request):
         if request.method == "POST":
@@ -27,6 +43,7 @@ class StandardAdmin(admin.ModelAdmin):
             if form.is_valid():
                 uploaded_file = request.FILES["file"]
                 try:
+                    pd = providers.pandas()
                     # Check the file extension to decide which pandas function to use
                     if uploaded_file.name.endswith('.xlsx'):
                         df = pd.read_excel(uploaded_file)
@@ -37,20 +54,23 @@ class StandardAdmin(admin.ModelAdmin):
                         self.message_user(request, "Unsupported file format. Please upload a .xlsx or .csv file.", level=messages.ERROR)
                         return redirect(".") # Redirect back to the upload page
                     
-                    # Loop through each row in the DataFrame
-                    for index, row in df.iterrows():
-                        # Use update_or_create to avoid duplicates based on the 'code'
-                        Standard.objects.update_or_create(
-                            level=row['level'],
-                            code=row['code'],
-                            defaults={
-                                'chapter': row['chapter'],
-                                'chapter_order': row['chapter_order'],                              
-                                'unit': row['unit'],
-                                'unit_order': row['unit_order'],
-                                'description': row['description'],
-                            }
-                        )
+                    # The whole file is imported in one transaction, then the catalogue is bumped once.
+                    with transaction.atomic():
+                        # Loop through each row in the DataFrame
+                        for index, row in df.iterrows():
+                            # Use update_or_create to avoid duplicates based on the 'code'
+                            Standard.objects.update_or_create(
+                                level=row['level'],
+                                code=row['code'],
+                                defaults={
+                                    'chapter': row['chapter'],
+                                    'chapter_order': row['chapter_order'],                              
+                                    'unit': row['unit'],
+                                    'unit_order': row['unit_order'],
+                                    'description': row['description'],
+                                }
+                            )
+                        bump_standards_catalogue()
                     
                     # Send a success message to the user
                     self.message_user(request, "Standards have been successfully uploaded.")
@@ -63,9 +83,42 @@ class StandardAdmin(admin.ModelAdmin):
         context = {"form": form}
         return render(request, "admin/standard_upload.html", context)
 
-admin.site.register(BiologyClass)
-admin.site.register(Student)
-admin.site.register(Test)
-admin.site.register(Question)
-admin.site.register(Score)
-admin.site.register(Comment)
\ No newline at end of file
+# Deletes are not logged by signals (see biology_app/changes.py), so the admin logs them.
+@admin.register(Student, Test, Question, Score, Comment)
+class ChangeLoggedAdmin(admin.ModelAdmin):
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        log_deletes(obj._meta.base_manager.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        log_deletes(queryset)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(BiologyClass)
+class BiologyClassAdmin(admin.ModelAdmin):
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        log_class_deletes([obj.pk])
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        log_class_deletes(list(queryset.values_list('pk', flat=True)))
+        super().delete_queryset(request, queryset)
+
+
+admin.site.register(ReportJob)
+
+@admin.register(StudentAlert)
+class StudentAlertAdmin(admin.ModelAdmin):
+    list_display = ('student', 'rule', 'message', 'is_active', 'raised_at', 'cleared_at')
+    list_filter = ('is_active', 'rule')
+
+
+@admin.register(ScheduledTaskRun)
+class ScheduledTaskRunAdmin(admin.ModelAdmin):
+    list_display = ('task', 'started_at', 'duration_ms', 'succeeded')
+    list_filter = ('task', 'succeeded')
@@ -0,0 +1,136 @@
+# biology_app/ai_context.py
+# Builds the AI prompts on the server from a student id, so the browser no longer has to
+# fetch the student's performance and post it back. Each prompt, template text included,
+# stays within AI_PROMPT_TOKEN_BUDGET (as estimated by estimate_tokens). When it has to be
+# trimmed, the weakest and strongest standards and the most recent comments are kept first.
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Q, Sum, When
+
+from .models import Standard
+
+# A rough but stable estimate; the model's tokenizer averages about four characters per token.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def student_mastery(student):
+    # Mastery per standard across the student's active (non-archived) tests.
+    return Standard.objects.filter(
+        questions__score__student=student, questions__test__is_archived=False
+    ).distinct().annotate(
+        total_awarded=Sum('questions__score__mark_awarded', filter=Q(questions__score__student=student, questions__test__is_archived=False)),
+        total_possible=Sum('questions__max_mark', filter=Q(questions__score__student=student)),
+        percentage=Case(When(total_possible__gt=0, then=(F('total_awarded') * 100.0) / F('total_possible')), default=0.0, output_field=FloatField())
+    ).values('id', 'unit', 'code', 'description', 'percentage')
+
+
+def _extremes_first(standards):
+    # Weakest, strongest, second weakest, second strongest, ...
+    ordered = sorted(standards, key=lambda standard: standard['percentage'] or 0)
+    low, high = 0, len(ordered) - 1
+    while low <= high:
+        yield ordered[low]
+        if low != high:
+            yield ordered[high]
+        low += 1
+        high -= 1
+
+
+def _standard_line(standard):
+    return f"- {standard['code']} ({standard['unit']}): {round(standard['percentage'] or 0)}% mastery\n"
+
+
+def _comment_line(comment):
+    return f"- {comment['text']}\n"
+
+
+def build_student_context(student, include_comments=True, budget=None):
+    # Returns the standard and comment lines for the prompt, trimmed to the token budget.
+    budget = settings.AI_PROMPT_TOKEN_BUDGET if budget is None else budget
+    standards = list(student_mastery(student))
+    comments = list(student.comments.order_by('-created_at').values('text')[:settings.AI_CONTEXT_MAX_COMMENTS]) if include_comments else []
+
+    # Standards and comments share the budget. Candidates alternate between them
+    # so that neither one uses up the whole budget.
+    candidates = []
+    standard_lines = [('standard', _standard_line(standard)) for standard in _extremes_first(standards)]
+    comment_lines = [('comment', _comment_line(comment)) for comment in comments]
+    for i in range(max(len(standard_lines), len(comment_lines))):
+        candidates.extend(lines[i] for lines in (standard_lines, comment_lines) if i < len(lines))
+
+    kept = {'standard': [], 'comment': []}
+    used = 0
+    for kind, line in candidates:
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            continue
+        kept[kind].append(line)
+        used += cost
+    return {
+        'standard_lines': kept['standard'],
+        'comment_lines': kept['comment'],
+        'trimmed': len(kept['standard']) + len(kept['comment']) < len(candidates),
+    }
+
+
+def build_prompt(student, template, include_comments=True):
+    # Renders `template` (summary_prompt or comment_prompt) with the lines that fit in what
+    # the template text leaves of the budget. The template is measured with its "no data"
+    # placeholders, which only overcounts.
+    empty = {'standard_lines': [], 'comment_lines': [], 'trimmed': False}
+    budget = max(0, settings.AI_PROMPT_TOKEN_BUDGET - estimate_tokens(template(student, empty)))
+    return template(student, build_student_context(student, include_comments, budget))
+
+
+def summary_prompt(student, context):
+    prompt = f"""
+        You are an expert, insightful, and encouraging high school biology teaching assistant.
+        Your task is to provide a diagnostic summary for a teacher about a student's performance.
+        The summary should be structured, clear, and provide actionable suggestions.
+
+        **Student:** {student.first_name} {student.last_name}
+
+        **Quantitative Data (Mastery on Standards):**
+        """
+    prompt += ''.join(context['standard_lines']) or "- No quantitative performance data available.\n"
+    prompt += "\n**Qualitative Data (Teacher's Comments):**\n"
+    prompt += ''.join(context['comment_lines']) or "- No teacher comments available.\n"
+    prompt += """
+        **Instructions:**
+        Based on all the data above, generate a diagnostic report with the following three sections.
+        Use markdown for formatting (bold headings).
+
+        **1. Areas of Strength:**
+        Identify 1-2 key units or concepts where the student is demonstrating strong understanding (high scores). Be specific.
+
+        **2. Areas for Improvement:**
+        Identify 1-2 specific units or concepts where the student is struggling (low scores). If there are relevant teacher comments, connect them to the quantitative data.
+
+        **3. Suggested Next Steps:**
+        Provide 2-3 concrete, actionable suggestions for the teacher to help this student. These could include targeted review activities, different teaching strategies, or specific topics to revisit.
+        """
+    return prompt
+
+
+def comment_prompt(student, context):
+    prompt = f"""
+        You are a professional and encouraging high school biology teacher.
+        Your task is to write a 3-sentence report card comment for a student.
+
+        **Student Name:** {student.first_name} {student.last_name}
+
+        **Performance Data (Mastery on Standards):**
+        """
+    prompt += ''.join(context['standard_lines']) or "- No performance data available.\n"
+    prompt += """
+        **Instructions:**
+        Based on the data, write a 3-sentence comment with the following structure:
+        1. Start with a general, positive description of the student's engagement or progress.
+        2. Mention one specific area of strength (a high-scoring unit or concept) and one specific area for improvement (a low-scoring unit or concept), referencing the competency code if possible.
+        3. End with an encouraging remark about their potential or next steps.
+        The tone must be professional, supportive, and concise.
+        """
+    return prompt
@@ -0,0 +1,100 @@
+# biology_app/alerts.py
+# The at-risk engine. It re-evaluates only the students whose scores changed. Each
+# batch costs four queries (plus the writes), however many students it covers.
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .catalogue import get_standards_catalogue
+from .models import Score, Student, StudentAlert
+
+
+def _percentage(awarded, possible):
+    return (awarded * 100.0 / possible) if possible else 0.0
+
+
+def _latest_test_flag(rules, history):
+    # history: the student's active tests, oldest first, as (test_id, title, percentage).
+    if not history:
+        return None
+    test_id, title, percentage = history[-1]
+    if percentage < rules['LATEST_TEST_THRESHOLD']:
+        return test_id, percentage, f"Scored {percentage:.0f}% on {title}."
+    return None
+
+
+def _falling_trend_flag(rules, history):
+    recent = history[-rules['TREND_TESTS']:]
+    if len(recent) < rules['TREND_TESTS']:
+        return None
+    percentages = [percentage for _, _, percentage in recent]
+    falling = all(later < earlier for earlier, later in zip(percentages, percentages[1:]))
+    drop = percentages[0] - percentages[-1]
+    if falling and drop >= rules['TREND_MIN_DROP']:
+        return recent[-1][0], drop, f"Down {drop:.0f} points over the last {len(recent)} tests."
+    return None
+
+
+def evaluate_students(student_ids):
+    # Brings the active StudentAlert rows of these students in line with the rules.
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+    rules = settings.AT_RISK_RULES
+    catalogue = get_standards_catalogue()
+    active_scores = Score.objects.filter(student_id__in=student_ids, question__test__is_archived=False)
+
+    histories = {student_id: [] for student_id in student_ids}
+    test_rows = (active_scores
+                 .values('student_id', 'question__test_id', 'question__test__title', 'question__test__date_administered')
+                 .annotate(awarded=Sum('mark_awarded'), possible=Sum('question__max_mark'))
+                 .order_by('student_id', 'question__test__date_administered', 'question__test_id'))
+    for row in test_rows:
+        histories[row['student_id']].append(
+            (row['question__test_id'], row['question__test__title'], _percentage(row['awarded'], row['possible']))
+        )
+
+    wanted = {}
+    for student_id, history in histories.items():
+        for rule, flag in [('latest_test', _latest_test_flag(rules, history)),
+                           ('falling_trend', _falling_trend_flag(rules, history))]:
+            if flag:
+                wanted[(student_id, rule, None)] = flag
+
+    standard_rows = (active_scores.exclude(question__standards=None)
+                     .values('student_id', 'question__standards')
+                     .annotate(awarded=Sum('mark_awarded'), possible=Sum('question__max_mark')))
+    for row in standard_rows:
+        # Standards assessed on only a couple of marks are too noisy to flag.
+        if row['possible'] < rules['STANDARD_MIN_MARKS']:
+            continue
+        percentage = _percentage(row['awarded'], row['possible'])
+        if percentage < rules['STANDARD_MASTERY_FLOOR']:
+            standard = catalogue.by_id.get(row['question__standards'], {})
+            wanted[(row['student_id'], 'standard_mastery', row['question__standards'])] = (
+                None, percentage, f"{percentage:.0f}% mastery on {standard.get('code', 'a standard')}."
+            )
+
+    now = timezone.now()
+    to_update, to_clear = [], []
+    for alert in StudentAlert.objects.filter(student_id__in=student_ids, is_active=True):
+        flag = wanted.pop((alert.student_id, alert.rule, alert.standard_id), None)
+        if flag is None:
+            alert.is_active = False
+            alert.cleared_at = now
+            to_clear.append(alert)
+        elif (alert.test_id, alert.value, alert.message) != flag:
+            alert.test_id, alert.value, alert.message = flag
+            to_update.append(alert)
+    for alert in to_update + to_clear:
+        alert.updated_at = now
+
+    StudentAlert.objects.bulk_update(to_update + to_clear, ['test', 'value', 'message', 'is_active', 'cleared_at', 'updated_at'])
+    StudentAlert.objects.bulk_create([
+        StudentAlert(student_id=student_id, rule=rule, standard_id=standard_id, test_id=test_id, value=value, message=message)
+        for (student_id, rule, standard_id), (test_id, value, message) in wanted.items()
+    ])
+
+
+def evaluate_class(biology_class_id):
+    evaluate_students(Student.objects.filter(biology_class_id=biology_class_id).values_list('id', flat=True))
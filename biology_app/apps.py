@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class BiologyAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'biology_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Heavy providers load lazily unless the deployment asks for them up front.
+        from django.conf import settings
+        if settings.PRELOAD_PROVIDERS:
+            from . import providers
+            providers.warmup(settings.PRELOAD_PROVIDERS)
@@ -0,0 +1,119 @@
+# biology_app/authentication.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .catalogue import bump_version, get_version
+
+User = get_user_model()
+
+# The password hash is never cached. Users rebuilt from the cache defer that field,
+# so a later save() only writes the fields that were loaded.
+CACHED_USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+CACHED_TOKEN_FIELDS = [field.attname for field in Token._meta.concrete_fields]
+
+
+class TokenCache:
+    # A bounded least-recently-used map of token digest -> resolved user, private to this process.
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is not None:
+                self.entries.move_to_end(digest)
+            return entry
+
+    def set(self, digest, entry):
+        with self.lock:
+            self.entries[digest] = entry
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self.lock:
+            self.entries.pop(digest, None)
+
+    def discard_user(self, user_id):
+        with self.lock:
+            for digest in [digest for digest, entry in self.entries.items() if entry['user_id'] == user_id]:
+                del self.entries[digest]
+
+
+_tokens = TokenCache(settings.TOKEN_AUTH_CACHE_SIZE)
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _stamp_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def invalidate_token(key):
+    _tokens.discard(_digest(key))
+
+
+def invalidate_user_tokens(user_id):
+    # Drops the user's tokens here at once, and in every other worker and instance when
+    # they next check the user's version stamp.
+    bump_version(_stamp_key(user_id))
+    _tokens.discard_user(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # A drop-in for TokenAuthentication that caches token -> user resolution in each worker,
+    # so most requests authenticate without the Token + User join. Each entry carries the
+    # user's version stamp (a CacheVersion row), which logout, password changes and
+    # deactivation bump. A worker re-reads the stamp at most every TOKEN_AUTH_RECHECK_SECONDS,
+    # and entries are dropped after TOKEN_AUTH_CACHE_TTL regardless.
+
+    def authenticate_credentials(self, key):
+        digest = _digest(key)
+        now = time.monotonic()
+        entry = _tokens.get(digest)
+        if entry is not None and now >= entry['expires_at']:
+            entry = None
+        if entry is not None and now - entry['checked_at'] >= settings.TOKEN_AUTH_RECHECK_SECONDS:
+            if get_version(_stamp_key(entry['user_id'])) == entry['version']:
+                entry['checked_at'] = now
+            else:
+                entry = None
+        if entry is None:
+            return self._authenticate_and_cache(key, digest, now)
+
+        user = User.from_db(DEFAULT_DB_ALIAS, CACHED_USER_FIELDS, entry['user_values'])
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        token = Token.from_db(DEFAULT_DB_ALIAS, CACHED_TOKEN_FIELDS, entry['token_values'])
+        token.user = user
+        return user, token
+
+    def _authenticate_and_cache(self, key, digest, now):
+        # The stamp is read before the token and user, so a revocation that lands in between
+        # leaves the entry with an old stamp, and the next check drops it.
+        user_id = Token.objects.filter(key=key).values_list('user_id', flat=True).first()
+        version = get_version(_stamp_key(user_id)) if user_id is not None else 0
+        user, token = super().authenticate_credentials(key)
+        _tokens.set(digest, {
+            'user_id': user.pk,
+            'user_values': [getattr(user, name) for name in CACHED_USER_FIELDS],
+            'token_values': [getattr(token, name) for name in CACHED_TOKEN_FIELDS],
+            'version': version,
+            'checked_at': now,
+            'expires_at': now + settings.TOKEN_AUTH_CACHE_TTL,
+        })
+        return user, token
@@ -0,0 +1,73 @@
+# biology_app/authoring.py
+from django.db import transaction
+
+from .changes import log_changes, log_deletes
+from .models import Test, Question
+
+QuestionStandard = Question.standards.through
+
+
+def write_questions(test, questions):
+    # Makes the test's questions match `questions` exactly, in a fixed number of queries.
+    # Each item is a dict of question_number, question_text, max_mark and standard_ids.
+    # Questions are matched by number, so kept questions keep their scores.
+    # Question numbers are not unique within a test, so every row is kept: the first row
+    # with a number is matched and any duplicates are removed with the unmatched rows.
+    existing = {}
+    for question in Question.objects.filter(test=test).order_by('pk'):
+        existing.setdefault(question.question_number, []).append(question)
+    to_create, to_update, written = [], [], []
+    for data in questions:
+        matches = existing.get(data['question_number'])
+        question = matches.pop(0) if matches else None
+        if question is None:
+            question = Question(test=test, question_number=data['question_number'])
+            to_create.append(question)
+        else:
+            to_update.append(question)
+        question.question_text = data['question_text']
+        question.max_mark = data['max_mark']
+        written.append((question, data['standard_ids']))
+
+    removed = [question.pk for matches in existing.values() for question in matches]
+    if removed:
+        # Removed questions take their scores and standard links with them.
+        log_deletes(Question.objects.filter(pk__in=removed))
+        Question.objects.filter(pk__in=removed).delete()
+    if to_update:
+        Question.objects.bulk_update(to_update, ['question_text', 'max_mark'])
+        QuestionStandard.objects.filter(question__in=to_update).delete()
+    if to_create:
+        Question.objects.bulk_create(to_create)
+
+    QuestionStandard.objects.bulk_create([
+        QuestionStandard(question_id=question.pk, standard_id=standard_id)
+        for question, standard_ids in written
+        for standard_id in dict.fromkeys(standard_ids)
+    ])
+    # Bulk writes skip signals, so log them for delta sync here.
+    log_changes('question', [(question.pk, test.assigned_class_id) for question, _ in written])
+
+
+@transaction.atomic
+def clone_test(source, assigned_class, title=None, date_administered=None):
+    clone = Test.objects.create(
+        title=title or source.title,
+        date_administered=date_administered or source.date_administered,
+        assigned_class=assigned_class,
+        test_file_link=source.test_file_link,
+    )
+    source_questions = list(Question.objects.filter(test=source))
+    cloned_questions = Question.objects.bulk_create([
+        Question(test=clone, question_number=question.question_number,
+                 question_text=question.question_text, max_mark=question.max_mark)
+        for question in source_questions
+    ])
+    new_ids = {old.pk: new.pk for old, new in zip(source_questions, cloned_questions)}
+    links = QuestionStandard.objects.filter(question__test=source).values_list('question_id', 'standard_id')
+    QuestionStandard.objects.bulk_create([
+        QuestionStandard(question_id=new_ids[question_id], standard_id=standard_id)
+        for question_id, standard_id in links
+    ])
+    log_changes('question', [(question.pk, assigned_class.pk) for question in cloned_questions])
+    return clone
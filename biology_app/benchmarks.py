@@ -0,0 +1,393 @@
+# biology_app/benchmarks.py
+# Benchmarks run with `python manage.py benchmark <name>`. Anything they write to the
+# database is rolled back, so they are safe to run against a development copy.
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment
+from rest_framework.test import APIClient
+
+from .models import BiologyClass, Comment, ReportJob, Score, Standard, Student, StudentAlert, Question, Test
+from .providers import HEAVY_MODULES, available
+
+BENCHMARKS = {}
+
+# Suffix for seeded names, so benchmarks never clash with real (or earlier seeded) rows.
+RUN_ID = uuid.uuid4().hex[:6]
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def _test_environment():
+    # The test environment lets the client talk to the 'testserver' host.
+    try:
+        setup_test_environment()
+    except RuntimeError:
+        pass  # Already set up.
+
+
+def api_client():
+    _test_environment()
+    user = User.objects.create_user(username=f'benchmark-user-{RUN_ID}')
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@contextmanager
+def measure(results, label, requests=1):
+    # Records wall time, query count and request count for the enclosed block.
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+    results.append({'label': label, 'ms': round(elapsed * 1000, 1), 'queries': len(queries), 'requests': requests})
+
+
+def seed_standards(count, tag=''):
+    standards = Standard.objects.bulk_create([
+        Standard(level='IGCSE', chapter='Benchmark', chapter_order=99, unit='Benchmark',
+                 unit_order=i, code=f'BM{RUN_ID}{tag}.{i}', description='Benchmark standard')
+        for i in range(count)
+    ])
+    from .catalogue import bump_standards_catalogue, invalidate_standards_catalogue
+    bump_standards_catalogue()
+    invalidate_standards_catalogue()
+    return standards
+
+
+def seed_class(students, tests=5, questions=10, name='Benchmark class'):
+    # A class with scored tests and a comment per student, written with bulk_create.
+    biology_class = BiologyClass.objects.create(name=f'{name} {RUN_ID}')
+    standards = seed_standards(questions, tag=f'.{biology_class.pk}')
+    student_rows = Student.objects.bulk_create([
+        Student(first_name=f'Student{i}', last_name='Benchmark', biology_class=biology_class) for i in range(students)
+    ])
+    test_rows = Test.objects.bulk_create([
+        Test(title=f'Benchmark test {t}', date_administered=f'2025-01-{t + 1:02d}', assigned_class=biology_class)
+        for t in range(tests)
+    ])
+    question_rows = Question.objects.bulk_create([
+        Question(test=test, question_number=n + 1, question_text=f'Question {n + 1}', max_mark=5)
+        for test in test_rows for n in range(questions)
+    ])
+    Question.standards.through.objects.bulk_create([
+        Question.standards.through(question_id=question.pk, standard_id=standards[(question.question_number - 1) % len(standards)].pk)
+        for question in question_rows
+    ])
+    Score.objects.bulk_create([
+        Score(student=student, question=question, mark_awarded=(s + question.pk) % 6)
+        for s, student in enumerate(student_rows) for question in question_rows
+    ])
+    Comment.objects.bulk_create([Comment(student=student, text='Working steadily.') for student in student_rows])
+    return biology_class
+
+
+@benchmark('authoring')
+def authoring_benchmark(size=40):
+    # Builds a `size`-question test step by step (as TestManager does today), then in one nested request.
+    results = []
+    with rolled_back():
+        client = api_client()
+        biology_class = BiologyClass.objects.create(name=f'Benchmark class {RUN_ID}')
+        other_class = BiologyClass.objects.create(name=f'Benchmark class {RUN_ID} (copy)')
+        standards = seed_standards(10)
+        questions = [
+            {'question_number': n, 'question_text': f'Question {n}', 'max_mark': 4,
+             'standards': [standards[n % 10].id, standards[(n + 3) % 10].id]}
+            for n in range(1, size + 1)
+        ]
+        test_fields = {'title': 'Benchmark test', 'date_administered': '2025-01-01', 'assigned_class': biology_class.id}
+
+        with measure(results, f'step by step ({size} questions)', requests=size + 1):
+            test_id = client.post('/api/tests/', test_fields, format='json').data['id']
+            for question in questions:
+                client.post('/api/questions/', {**question, 'test': test_id}, format='json')
+
+        with measure(results, f'nested create ({size} questions)'):
+            response = client.post('/api/tests/nested/', {**test_fields, 'questions': questions}, format='json')
+        assert response.status_code == 201, response.data
+
+        with measure(results, f'nested replace ({size} questions)'):
+            client.put(f"/api/tests/{response.data['id']}/nested/", {**test_fields, 'questions': questions}, format='json')
+
+        with measure(results, f'clone ({size} questions)'):
+            client.post(f"/api/tests/{response.data['id']}/clone/", {'assigned_class': other_class.id}, format='json')
+    return results
+
+
+STARTUP_SCRIPT = """
+import json, os, time
+started = time.perf_counter()
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard_project.settings')
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_done = time.perf_counter()
+with open('/proc/self/status') as status:
+    rss_kb = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+print(json.dumps({'setup_ms': (setup_done - started) * 1000, 'urls_ms': (urls_done - setup_done) * 1000, 'rss_mb': rss_kb / 1024}))
+"""
+
+
+@benchmark('startup')
+def startup_benchmark(size=3):
+    # Cold-starts a fresh interpreter `size` times per mode and reports the median.
+    results = []
+    for label, preload in [('lazy providers', ''), ('preloaded providers', ','.join(name for name in HEAVY_MODULES if available(name)))]:
+        env = {**os.environ, 'PRELOAD_PROVIDERS': preload, 'PYTHONWARNINGS': 'ignore'}
+        runs = [
+            json.loads(subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=settings.BASE_DIR, env=env,
+                                      capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1])
+            for _ in range(size)
+        ]
+        results.append({
+            'label': label,
+            'setup_ms': round(statistics.median(run['setup_ms'] for run in runs), 1),
+            'urls_ms': round(statistics.median(run['urls_ms'] for run in runs), 1),
+            'rss_mb': round(statistics.median(run['rss_mb'] for run in runs), 1),
+        })
+    return results
+
+
+@benchmark('report-pack')
+def report_pack_benchmark(size=200):
+    # Builds the report pack of a `size`-student class, then times HTML rendering inline and in the pool.
+    from .reports import build_report_pack, gather_class_reports, render_reports
+    results = []
+    with rolled_back():
+        biology_class = seed_class(size)
+        with measure(results, f'gather ({size} students)', requests=0):
+            contexts = gather_class_reports(biology_class)
+        job = ReportJob.objects.create(biology_class=biology_class)
+        with measure(results, 'full HTML pack job', requests=0):
+            build_report_pack(job)
+        assert job.status == 'done', job.error
+        workers = max(2, settings.REPORT_PACK_WORKERS)
+        for label, use_pool in [('render inline', False), (f'render in pool ({workers} workers)', True)]:
+            with override_settings(REPORT_PACK_WORKERS=workers):
+                with measure(results, label, requests=0):
+                    list(render_reports(contexts, include_pdf=False, use_pool=use_pool))
+    return results
+
+
+@benchmark('auth')
+def auth_benchmark(size=50):
+    # `size` token-authenticated requests per authentication class, counting queries per request.
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.authtoken.models import Token
+    from .authentication import CachedTokenAuthentication, invalidate_token
+    from .views import BiologyClassViewSet
+    results = []
+    with rolled_back():
+        user = User.objects.create_user(username=f'benchmark-token-user-{RUN_ID}')
+        token = Token.objects.create(user=user)
+        invalidate_token(token.key)
+        _test_environment()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        original = BiologyClassViewSet.authentication_classes
+        try:
+            for authentication_class in [TokenAuthentication, CachedTokenAuthentication]:
+                BiologyClassViewSet.authentication_classes = [authentication_class]
+                with measure(results, authentication_class.__name__, requests=size):
+                    for _ in range(size):
+                        assert client.get('/api/classes/').status_code == 200
+                results[-1]['queries_per_request'] = round(results[-1]['queries'] / size, 2)
+        finally:
+            BiologyClassViewSet.authentication_classes = original
+            invalidate_token(token.key)
+    return results
+
+
+@benchmark('alerts')
+def alerts_benchmark(size=30):
+    # A `size`-student x 40-question bulk score save (1,200 cells by default), then the alert pass it triggers.
+    from .alerts import evaluate_students
+    results = []
+    with rolled_back():
+        client = api_client()
+        biology_class = seed_class(size, tests=4, questions=40)
+        test = Test.objects.filter(assigned_class=biology_class).order_by('-date_administered').first()
+        question_ids = list(test.questions.values_list('id', flat=True))
+        student_ids = list(biology_class.students.values_list('id', flat=True))
+        scores = {student_id: {question_id: (student_id + question_id) % 3 for question_id in question_ids} for student_id in student_ids}
+        with measure(results, f'bulk_score_entry ({size * len(question_ids)} cells)'):
+            client.post(f'/api/tests/{test.id}/bulk_score_entry/', {'scores': scores}, format='json')
+        # The benchmark's transaction never commits, so run the on_commit alert pass by hand.
+        with measure(results, f'alert pass ({size} students, first run)', requests=0):
+            evaluate_students(student_ids)
+        with measure(results, f'alert pass ({size} students, no changes)', requests=0):
+            evaluate_students(student_ids)
+        results[-1]['active_alerts'] = results[-2]['active_alerts'] = StudentAlert.objects.filter(student__in=student_ids, is_active=True).count()
+        results[0]['active_alerts'] = 0
+    return results
+
+
+class _FakeGenerativeModel:
+    # Stands in for Gemini so the benchmark measures only our side of the request.
+    def __init__(self, name):
+        self.name = name
+
+    def generate_content(self, prompt):
+        return type('Response', (), {'text': f'Summary of a {len(prompt)}-character prompt.'})()
+
+
+@benchmark('ai-context')
+def ai_context_benchmark(size=20):
+    # The old two-step flow (GET performance, post it all back) against posting only the student id.
+    from unittest import mock
+    from . import providers
+    results = []
+    with rolled_back():
+        client = api_client()
+        biology_class = seed_class(1, tests=size, questions=size)
+        student = biology_class.students.get()
+        Comment.objects.bulk_create([Comment(student=student, text=f'Comment {i}: ' + 'steady progress, ' * 10) for i in range(size)])
+        fake_genai = type('FakeGenai', (), {'GenerativeModel': _FakeGenerativeModel})
+        with mock.patch.object(providers, 'genai', return_value=fake_genai):
+            for _ in range(2):  # Warm up once, then measure.
+                results.clear()
+                with measure(results, 'two-step (performance + blob)', requests=2):
+                    performance = client.get(f'/api/students/{student.id}/performance/')
+                    payload = json.dumps(dict(performance.data), default=str)
+                    summary = client.post('/api/students/generate_summary/', payload, content_type='application/json')
+                results[-1]['bytes'] = len(performance.content) + len(payload) + len(summary.content)
+                with measure(results, 'one-step (student id)'):
+                    payload = json.dumps({'student_id': student.id})
+                    summary = client.post('/api/students/generate_summary/', payload, content_type='application/json')
+                results[-1]['bytes'] = len(payload) + len(summary.content)
+    return results
+
+
+@benchmark('rankings')
+def rankings_benchmark(size=100):
+    # A cohort of four `size`-student classes: one student's rank, from an ordered queryset and from the index.
+    from django.db.models import Case, F, FloatField, Q, Sum, When
+    from . import rankings
+    results = []
+    with rolled_back():
+        classes = [seed_class(size, tests=4, questions=10, name=f'Ranking class {n}') for n in range(4)]
+        BiologyClass.objects.filter(pk__in=[biology_class.pk for biology_class in classes]).update(level='A2')
+        biology_class = BiologyClass.objects.get(pk=classes[0].pk)
+        student = biology_class.students.first()
+        active = Q(score__question__test__is_archived=False)
+        with measure(results, f'ordered queryset rank ({4 * size} students)', requests=0):
+            ordered = list(Student.objects.filter(biology_class__level='A2').annotate(
+                total_awarded=Sum('score__mark_awarded', filter=active),
+                total_possible=Sum('score__question__max_mark', filter=active),
+                percentage=Case(When(total_possible__gt=0, then=(F('total_awarded') * 100.0) / F('total_possible')), default=0.0, output_field=FloatField())
+            ).order_by('-percentage').values_list('id', flat=True))
+            ordered.index(student.pk)
+        with measure(results, 'index build (first read)', requests=0):
+            rankings.cohort_ranking(biology_class).position(student.pk)
+        with measure(results, 'index rank + percentile', requests=0):
+            rankings.cohort_ranking(biology_class).position(student.pk)
+        with measure(results, 'index top/bottom 10', requests=0):
+            ranking = rankings.cohort_ranking(biology_class)
+            ranking.top(10), ranking.bottom(10)
+        Score.objects.filter(student=student).update(mark_awarded=5)
+        with measure(results, 'incremental update (1 student)', requests=0):
+            rankings.update_students({student.pk}, [])
+        with measure(results, 'full rebuild', requests=0):
+            rankings.invalidate_cohort('A2', biology_class.pk)
+            rankings.cohort_ranking(biology_class)
+    return results
+
+
+def _cpu_ms(func, repeat=20):
+    # Average CPU time of one call, in milliseconds.
+    started = time.process_time()
+    for _ in range(repeat):
+        result = func()
+    return round((time.process_time() - started) * 1000 / repeat, 2), result
+
+
+@benchmark('rendering')
+def rendering_benchmark(size=60):
+    # Encoding cost and wire size of the largest payloads: a `size`-student x 40-question score grid,
+    # the standards list and the class details page.
+    import gzip
+    from rest_framework.renderers import JSONRenderer
+    from . import renderers, rollups
+    from .catalogue import get_standards_catalogue
+    from .middleware import brotli
+    from .serializers import ScoreSerializer
+    results = []
+
+    def encode(label, build, render):
+        cpu_ms, content = _cpu_ms(lambda: render(build()))
+        row = {'label': label, 'cpu_ms': cpu_ms, 'bytes': len(content), 'gzip_bytes': len(gzip.compress(content, 6))}
+        row['br_bytes'] = len(brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)) if brotli else '-'
+        results.append(row)
+
+    with rolled_back():
+        seed_standards(size * 5)
+        biology_class = seed_class(size, tests=2, questions=40)
+        test = Test.objects.filter(assigned_class=biology_class).first()
+        # select_related keeps the old endpoint's per-row student/question queries out of the CPU figure.
+        scores = list(Score.objects.filter(question__test=test).select_related('student', 'question'))
+        details = rollups.build_class_details(biology_class)
+        standards = get_standards_catalogue().rows
+        stdlib = JSONRenderer().render
+        encode(f'scores: serializer + stdlib ({len(scores)} cells)', lambda: ScoreSerializer(scores, many=True).data, stdlib)
+        encode('scores: serializer + orjson', lambda: ScoreSerializer(scores, many=True).data, renderers.dumps)
+        encode('scores: values() + orjson', lambda: list(Score.objects.filter(question__test=test).values('student', 'question', 'mark_awarded')), renderers.dumps)
+        encode(f'standards: stdlib ({len(standards)} rows)', lambda: standards, stdlib)
+        encode('standards: orjson', lambda: standards, renderers.dumps)
+        encode(f'class details: stdlib ({size} students)', lambda: details, stdlib)
+        encode('class details: orjson', lambda: details, renderers.dumps)
+    return results
+
+
+@benchmark('roster')
+def roster_benchmark(size=5000):
+    # A `size`-row roster over 20 classes: a dry run, the first import, then a re-import with 10% of students moved.
+    from .roster import import_roster, read_roster
+    results = []
+    with rolled_back():
+        def roster(shift):
+            lines = ['name,class'] + [f'Student{i} Roster{RUN_ID},Roster class {(i + (shift if i % 10 == 0 else 0)) % 20} {RUN_ID}' for i in range(size)]
+            return read_roster(io.BytesIO('\n'.join(lines).encode()), 'roster.csv')
+
+        rows = roster(0)
+        with measure(results, f'dry run ({size} rows)', requests=0):
+            import_roster(rows, dry_run=True)
+        with measure(results, 'import (all new)', requests=0):
+            first = import_roster(rows)
+        with measure(results, 're-import (10% moved, sync)', requests=0):
+            second = import_roster(roster(1), sync=True)
+        for row, result in zip(results, [first, first, second]):
+            row.update(created=result['summary']['created'], moved=result['summary']['moved'])
+    return results
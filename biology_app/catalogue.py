@@ -0,0 +1,103 @@
+# biology_app/catalogue.py
+import threading
+import time
+from functools import cached_property
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+
+from .models import CacheVersion, Standard
+from .renderers import dumps
+
+STANDARDS_KEY = 'standards'
+STANDARD_FIELDS = [field.attname for field in Standard._meta.concrete_fields]
+
+
+class StandardsCatalogue:
+    # An immutable snapshot of every Standard row, in Meta.ordering order.
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = rows
+        self.by_id = {row['id']: row for row in rows}
+        # Codes are only unique within a level, so each code maps to every matching row.
+        self.by_code = {}
+        for row in rows:
+            self.by_code.setdefault(row['code'], []).append(row)
+        self.etag = f'"standards-{version}"'
+
+    def __contains__(self, pk):
+        return pk in self.by_id
+
+    @cached_property
+    def content(self):
+        # The list endpoint's JSON body, encoded once per catalogue version.
+        return dumps(self.rows)
+
+    def instance(self, pk):
+        # Builds a Standard as if it had been loaded from the database, without a query.
+        row = self.by_id[pk]
+        return Standard.from_db(DEFAULT_DB_ALIAS, STANDARD_FIELDS, [row[name] for name in STANDARD_FIELDS])
+
+
+_lock = threading.Lock()
+_catalogue = None
+_checked_at = 0.0
+
+
+def get_version(key):
+    version = CacheVersion.objects.filter(key=key).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_version(key):
+    updated = CacheVersion.objects.filter(key=key).update(version=F('version') + 1)
+    if not updated:
+        try:
+            with transaction.atomic():
+                CacheVersion.objects.create(key=key)
+        except IntegrityError:
+            # Another worker created the row first, so bump theirs.
+            CacheVersion.objects.filter(key=key).update(version=F('version') + 1)
+
+
+def bump_versions(keys):
+    # Bumps several stamps with one UPDATE, creating any that do not exist yet.
+    keys = set(keys)
+    if not keys:
+        return
+    updated = CacheVersion.objects.filter(key__in=keys).update(version=F('version') + 1)
+    if updated < len(keys):
+        missing = keys - set(CacheVersion.objects.filter(key__in=keys).values_list('key', flat=True))
+        # Created at 0 and bumped with the rest, so a stamp another worker created in the
+        # meantime is bumped as well.
+        CacheVersion.objects.bulk_create([CacheVersion(key=key, version=0) for key in missing], ignore_conflicts=True)
+        CacheVersion.objects.filter(key__in=missing).update(version=F('version') + 1)
+
+
+def invalidate_standards_catalogue():
+    global _catalogue
+    _catalogue = None
+
+
+def bump_standards_catalogue():
+    # Call this after any change to Standard rows.
+    bump_version(STANDARDS_KEY)
+    transaction.on_commit(invalidate_standards_catalogue)
+
+
+def get_standards_catalogue():
+    global _catalogue, _checked_at
+    # Within the recheck window the cached copy is trusted without touching the database.
+    recheck_seconds = getattr(settings, 'STANDARDS_CATALOGUE_RECHECK_SECONDS', 5)
+    catalogue = _catalogue
+    if catalogue is not None and time.monotonic() - _checked_at < recheck_seconds:
+        return catalogue
+    with _lock:
+        # Read the version before the rows, so the rows are never older than the stamp.
+        version = get_version(STANDARDS_KEY)
+        if _catalogue is None or _catalogue.version != version:
+            rows = list(Standard.objects.order_by(*Standard._meta.ordering).values(*STANDARD_FIELDS))
+            _catalogue = StandardsCatalogue(version, rows)
+        _checked_at = time.monotonic()
+        return _catalogue
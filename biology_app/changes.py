@@ -0,0 +1,142 @@
+# biology_app/changes.py
+# The change log behind /api/changes/. Single-object saves are logged by signals (see
+# signals.py). Bulk writes skip signals, so they call log_changes() themselves.
+# Deletes are logged with log_deletes() by the code that deletes, before the rows go.
+# A delete listener would stop Django from fast-deleting the scores and comments that
+# cascade from a question or student, costing queries per row. Those cascaded rows are
+# not logged; clients drop a deleted row's scores and comments along with it.
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .catalogue import bump_version, bump_versions, get_version
+from .models import CacheVersion, ChangeLogEntry, Comment, Question, Score, Student, Test
+
+SYNCED_MODELS = {
+    'score': Score,
+    'student': Student,
+    'test': Test,
+    'question': Question,
+    'comment': Comment,
+}
+
+# Everything at or below this seq has been trimmed; clients behind it must refetch.
+HORIZON_KEY = 'changes-horizon'
+# Every writer locks this row before it inserts (see _claim_seqs).
+WRITER_LOCK_KEY = 'changes-writer'
+
+
+# Where each synced model finds its class, for logging rows in bulk.
+CLASS_PATHS = {
+    'score': 'student__biology_class_id',
+    'student': 'biology_class_id',
+    'test': 'assigned_class_id',
+    'question': 'test__assigned_class_id',
+    'comment': 'student__biology_class_id',
+}
+
+
+def _class_id_of(instance):
+    if isinstance(instance, Student):
+        return instance.biology_class_id
+    if isinstance(instance, Test):
+        return instance.assigned_class_id
+    if isinstance(instance, Question):
+        return Test.all_objects.filter(pk=instance.test_id).values_list('assigned_class_id', flat=True).first()
+    # Scores and comments belong to the student's class.
+    return Student.objects.filter(pk=instance.student_id).values_list('biology_class_id', flat=True).first()
+
+
+def class_version_key(class_id):
+    # A per-class stamp, bumped in the same transaction as every change-log entry for the
+    # class. Cached rollups of the class are tagged with it (see rollups.py).
+    return f'class-changes:{class_id}'
+
+
+def stored_class_id(instance):
+    # The class the row belongs to in the database, before a pending save.
+    path = CLASS_PATHS[instance._meta.model_name]
+    return instance._meta.base_manager.filter(pk=instance.pk).values_list(path, flat=True).first()
+
+
+def _bump_classes(class_ids):
+    bump_versions(class_version_key(class_id) for class_id in set(class_ids) if class_id is not None)
+
+
+def _claim_seqs():
+    # Seqs come from an autoincrement, which orders inserts rather than commits. On Postgres
+    # a transaction can take seq 10 and commit after another has committed seq 11, and a
+    # client that had already read 11 would never see 10. So every writer bumps this row
+    # first and holds its lock until it commits: seqs are then handed out in commit order.
+    bump_version(WRITER_LOCK_KEY)
+
+
+@transaction.atomic
+def log_change(instance, action, previous_class_id=None):
+    # A row that moved class is logged under the class it left too, so that class's
+    # feed and rollups see it go.
+    class_ids = sorted({_class_id_of(instance), previous_class_id} - {None}) or [None]
+    _claim_seqs()
+    _bump_classes(class_ids)
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model=instance._meta.model_name, object_id=instance.pk, biology_class_id=class_id, action=action)
+        for class_id in class_ids
+    ])
+
+
+@transaction.atomic
+def log_changes(model_name, rows, action='upsert'):
+    # rows: (object_id, biology_class_id) pairs, written in one bulk insert.
+    rows = list(rows)
+    _claim_seqs()
+    _bump_classes(class_id for _, class_id in rows)
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model=model_name, object_id=object_id, biology_class_id=class_id, action=action)
+        for object_id, class_id in rows
+    ])
+
+
+@transaction.atomic
+def log_deletes(queryset):
+    # Logs the deletion of every row in `queryset`, in one read and one bulk insert.
+    # Deleted scores carry their student and question, so clients can find them locally.
+    model_name = queryset.model._meta.model_name
+    identity = ['student_id', 'question_id'] if model_name == 'score' else []
+    rows = list(queryset.values_list('pk', CLASS_PATHS[model_name], *identity))
+    _claim_seqs()
+    _bump_classes(class_id for _, class_id, *_ in rows)
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model=model_name, object_id=object_id, biology_class_id=class_id, action='delete',
+                       data={'student': rest[0], 'question': rest[1]} if rest else None)
+        for object_id, class_id, *rest in rows
+    ])
+
+
+def log_class_deletes(class_ids):
+    # A deleted class takes its students and tests with it.
+    log_deletes(Student.objects.filter(biology_class_id__in=class_ids))
+    log_deletes(Test.all_objects.filter(assigned_class_id__in=class_ids))
+
+
+def get_horizon():
+    return get_version(HORIZON_KEY)
+
+
+def compact_changes(retention_days):
+    # Drops entries superseded by a later entry for the same row in the same class (clients
+    # only need the latest), then trims everything older than the retention window. A move
+    # is logged under both classes, and the entry under the old class is how a client
+    # following only that class learns the row left, so it is kept.
+    latest_per_row = ChangeLogEntry.objects.values('model', 'object_id', 'biology_class_id').annotate(last_seq=Max('seq')).values('last_seq')
+    superseded, _ = ChangeLogEntry.objects.exclude(seq__in=latest_per_row).delete()
+
+    expired = ChangeLogEntry.objects.filter(created_at__lt=timezone.now() - timedelta(days=retention_days))
+    horizon = expired.aggregate(last_seq=Max('seq'))['last_seq']
+    trimmed = 0
+    if horizon:
+        trimmed, _ = expired.filter(seq__lte=horizon).delete()
+        if horizon > get_horizon():
+            CacheVersion.objects.update_or_create(key=HORIZON_KEY, defaults={'version': horizon})
+    return superseded, trimmed
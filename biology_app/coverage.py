@@ -0,0 +1,38 @@
+# biology_app/coverage.py
+# Maintains StandardCoverage: (class, standard) -> tests, marks and last assessed date.
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from .models import Question, StandardCoverage
+
+
+def coverage_rows(class_id, standard_ids=None):
+    questions = Question.objects.filter(test__assigned_class_id=class_id, test__is_archived=False)
+    if standard_ids is not None:
+        questions = questions.filter(standards__in=standard_ids)
+    totals = (questions.exclude(standards=None)
+              .values('standards')
+              .annotate(tests=Count('test', distinct=True), marks=Sum('max_mark'), last=Max('test__date_administered')))
+    return [
+        StandardCoverage(biology_class_id=class_id, standard_id=row['standards'], assessment_count=row['tests'],
+                         total_marks=row['marks'] or 0, last_assessed=row['last'])
+        for row in totals
+    ]
+
+
+@transaction.atomic
+def refresh_coverage(class_id, standard_ids=None):
+    # Recomputes the class's coverage for the given standards (all of them by default).
+    if standard_ids is not None:
+        standard_ids = set(standard_ids)
+        if not standard_ids:
+            return
+    existing = StandardCoverage.objects.filter(biology_class_id=class_id)
+    if standard_ids is not None:
+        existing = existing.filter(standard_id__in=standard_ids)
+    existing.delete()
+    StandardCoverage.objects.bulk_create(coverage_rows(class_id, standard_ids))
+
+
+def test_standard_ids(test):
+    return set(Question.standards.through.objects.filter(question__test=test).values_list('standard_id', flat=True))
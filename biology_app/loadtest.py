@@ -0,0 +1,281 @@
+# biology_app/loadtest.py
+# Load generator for `manage.py loadtest`. It replays the frontend's main flows against a
+# running server (runserver or gunicorn) and a seeded database. Virtual teachers log in
+# through /api/auth/login/, then loop over weighted scenarios. Each stage adds more of
+# them, until throughput stops growing or latency and errors pass their limits.
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# A stage is saturated when throughput grows by less than this fraction over the best stage so far...
+SATURATION_GAIN = 0.10
+# ...or when more than this fraction of its requests fail.
+MAX_ERROR_RATE = 0.01
+
+LOGIN_ENDPOINT = 'POST /api/auth/login/'
+
+
+class Teacher:
+    # One virtual user with its own HTTP session (keep-alive, like a browser tab).
+    def __init__(self, base_url, timeout, records):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.records = records
+        self.session = requests.Session()
+
+    def login(self, username, password):
+        # Returns whether the login worked; near saturation it often does not.
+        response = self.call('POST', LOGIN_ENDPOINT, '/api/auth/login/', json={'username': username, 'password': password})
+        try:
+            key = response.json()['key'] if response is not None and response.status_code == 200 else None
+        except (ValueError, KeyError):
+            key = None
+        if key:
+            self.session.headers['Authorization'] = f"Token {key}"
+        return bool(key)
+
+    def call(self, method, endpoint, path, **kwargs):
+        # `endpoint` is the label the timing is reported under, e.g. 'GET /api/classes/{id}/details/'.
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.records.append((endpoint, time.perf_counter() - started, ok))
+        return response
+
+    def get_json(self, endpoint, path, default=None):
+        response = self.call('GET', endpoint, path)
+        return response.json() if response is not None and response.ok else default
+
+
+# --- Scenarios (mirroring the Vue views) ---
+
+def home_view(teacher, world, rng):
+    teacher.call('GET', 'GET /api/dashboard-stats/', '/api/dashboard-stats/')
+
+
+def class_detail_view(teacher, world, rng):
+    biology_class = rng.choice(world)
+    teacher.call('GET', 'GET /api/classes/{id}/details/', f"/api/classes/{biology_class['id']}/details/")
+
+
+def _load_grid(teacher, biology_class, rng):
+    # TestManager: pick a class, then a test, then fill the score grid.
+    class_id = biology_class['id']
+    teacher.call('GET', 'GET /api/tests/?search={class}', f'/api/tests/?search={class_id}')
+    students = teacher.get_json('GET /api/students/?search={class}', f'/api/students/?search={class_id}', [])
+    teacher.call('GET', 'GET /api/standards/', '/api/standards/')
+    if not biology_class['tests']:
+        return None
+    test_id = rng.choice(biology_class['tests'])
+    test = teacher.get_json('GET /api/tests/{id}/', f'/api/tests/{test_id}/')
+    scores = teacher.get_json('GET /api/tests/{id}/scores/', f'/api/tests/{test_id}/scores/', [])
+    if not test or not test.get('questions'):
+        return None
+    existing = {(score['student'], score['question']): score['mark_awarded'] for score in scores}
+    grid = {
+        str(student['id']): {str(question['id']): existing.get((student['id'], question['id']), '') for question in test['questions']}
+        for student in students
+    }
+    return test, grid
+
+
+def test_manager_view(teacher, world, rng):
+    _load_grid(teacher, rng.choice(world), rng)
+
+
+def test_manager_save(teacher, world, rng):
+    # Loads the grid, changes one cell, and saves the whole grid as "Save All Scores" does.
+    loaded = _load_grid(teacher, rng.choice(world), rng)
+    if not loaded or not loaded[1]:
+        return
+    test, grid = loaded
+    question = rng.choice(test['questions'])
+    grid[rng.choice(list(grid))][str(question['id'])] = rng.randint(0, question['max_mark'])
+    teacher.call('POST', 'POST /api/tests/{id}/bulk_score_entry/', f"/api/tests/{test['id']}/bulk_score_entry/", json={'scores': grid})
+
+
+def student_modal(teacher, world, rng):
+    students = [student_id for biology_class in world for student_id in biology_class['students']]
+    if students:
+        teacher.call('GET', 'GET /api/students/{id}/performance/', f'/api/students/{rng.choice(students)}/performance/')
+
+
+# Scenario -> weight, roughly how often teachers use each screen.
+SCENARIOS = {
+    'home': (home_view, 3),
+    'class_detail': (class_detail_view, 3),
+    'test_manager': (test_manager_view, 2),
+    'score_save': (test_manager_save, 1),
+    'student_modal': (student_modal, 3),
+}
+WRITE_SCENARIOS = {'score_save'}
+
+
+def discover(teacher, max_classes=20):
+    # The classes, students and tests the scenarios pick from.
+    world = []
+    for biology_class in teacher.get_json('GET /api/classes/', '/api/classes/', [])[:max_classes]:
+        class_id = biology_class['id']
+        students = teacher.get_json('GET /api/students/?search={class}', f'/api/students/?search={class_id}', [])
+        tests = teacher.get_json('GET /api/tests/?search={class}', f'/api/tests/?search={class_id}', [])
+        world.append({'id': class_id, 'students': [s['id'] for s in students], 'tests': [t['id'] for t in tests]})
+    return world
+
+
+# --- Measurement ---
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return 0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarise(records, elapsed):
+    by_endpoint = {}
+    for endpoint, seconds, ok in records:
+        by_endpoint.setdefault(endpoint, []).append((seconds, ok))
+    endpoints = {}
+    for endpoint, samples in sorted(by_endpoint.items()):
+        times = sorted(seconds * 1000 for seconds, _ in samples)
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(percentile(times, 50), 1),
+            'p95_ms': round(percentile(times, 95), 1),
+            'p99_ms': round(percentile(times, 99), 1),
+        }
+    times = sorted(seconds * 1000 for _, seconds, _ in records)
+    errors = sum(1 for _, _, ok in records if not ok)
+    return {
+        'requests': len(records),
+        'errors': errors,
+        'error_rate': round(errors / len(records), 4) if records else 0,
+        'rps': round(len(records) / elapsed, 2),
+        'p50_ms': round(percentile(times, 50), 1),
+        'p95_ms': round(percentile(times, 95), 1),
+        'p99_ms': round(percentile(times, 99), 1),
+        'endpoints': endpoints,
+    }
+
+
+def run_stage(options, world, scenarios, concurrency):
+    # Runs `concurrency` teachers for the stage duration. Logins happen first; only failed
+    # ones are counted, as errors of the stage. A teacher whose login failed sits the stage out.
+    records, login_records = [], []
+    login_started = time.perf_counter()
+    teachers = []
+    for _ in range(concurrency):
+        teacher = Teacher(options['base_url'], options['timeout'], login_records)
+        if teacher.login(options['username'], options['password']):
+            teachers.append(teacher)
+    records.extend(record for record in login_records if not record[2])
+    if not teachers:
+        elapsed = time.perf_counter() - login_started
+        return dict(concurrency=concurrency, duration_s=round(elapsed, 2), **summarise(records, elapsed))
+
+    names = list(scenarios)
+    weights = [scenarios[name][1] for name in names]
+    stop = threading.Event()
+
+    def teacher_loop(number):
+        teacher = teachers[number]
+        teacher.records = records
+        rng = random.Random(options['seed'] * 1000 + number)
+        while not stop.is_set():
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                scenarios[name][0](teacher, world, rng)
+            except Exception:
+                # e.g. a truncated JSON body; the scenario counts as one failed request.
+                records.append((f'scenario {name}', time.perf_counter() - started, False))
+            if options['think']:
+                stop.wait(options['think'])
+
+    with ThreadPoolExecutor(max_workers=len(teachers)) as pool:
+        started = time.perf_counter()
+        futures = [pool.submit(teacher_loop, number) for number in range(len(teachers))]
+        stop.wait(options['duration'])
+        stop.set()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+    return dict(concurrency=concurrency, duration_s=round(elapsed, 2), **summarise(records, elapsed))
+
+
+def find_saturation(stages, max_p95_ms):
+    # The last stage before throughput flattened out, or before latency/errors went over their limits.
+    best = None
+    for stage in stages:
+        over_limits = stage['error_rate'] > MAX_ERROR_RATE or stage['p95_ms'] > max_p95_ms
+        flattened = best and stage['rps'] < best['rps'] * (1 + SATURATION_GAIN)
+        if over_limits or flattened:
+            reason = 'limits' if over_limits else 'throughput'
+            return {'concurrency': best['concurrency'] if best else None, 'rps': best['rps'] if best else 0,
+                    'saturated_at': stage['concurrency'], 'reason': reason}
+        best = stage
+    return {'concurrency': best['concurrency'] if best else None, 'rps': best['rps'] if best else 0,
+            'saturated_at': None, 'reason': 'not reached'}
+
+
+def run(options, log=print):
+    scenarios = {name: scenario for name, scenario in SCENARIOS.items()
+                 if not (options['read_only'] and name in WRITE_SCENARIOS)}
+    teacher = Teacher(options['base_url'], options['timeout'], [])
+    if not teacher.login(options['username'], options['password']):
+        raise RuntimeError(f"Login failed for {options['username']}.")
+    world = discover(teacher)
+    if not world:
+        raise RuntimeError("The server has no classes to load test against; seed the database first.")
+    stages, aborted = [], None
+    for concurrency in options['concurrency']:
+        try:
+            stage = run_stage(options, world, scenarios, concurrency)
+        except Exception as e:
+            # Keep the stages already measured; the caller still writes them out.
+            aborted = f"Stage with {concurrency} teachers failed: {e}"
+            log(aborted)
+            break
+        stages.append(stage)
+        log(f"{concurrency:>4} teachers: {stage['rps']:>8} req/s  p50 {stage['p50_ms']} ms  "
+            f"p95 {stage['p95_ms']} ms  p99 {stage['p99_ms']} ms  errors {stage['errors']}")
+        saturation = find_saturation(stages, options['max_p95_ms'])
+        if saturation['saturated_at'] is not None and not options['full_ramp']:
+            break
+    return {
+        'base_url': options['base_url'],
+        'started_at': options['started_at'],
+        'scenarios': {name: weight for name, (_, weight) in scenarios.items()},
+        'stage_duration_s': options['duration'],
+        'think_s': options['think'],
+        'classes': len(world),
+        'stages': stages,
+        'saturation': find_saturation(stages, options['max_p95_ms']),
+        'aborted': aborted,
+    }
+
+
+def compare(previous, current):
+    # Lines describing how the peak stage changed since an earlier results file.
+    def peak(results):
+        concurrency = results['saturation']['concurrency']
+        return next((stage for stage in results['stages'] if stage['concurrency'] == concurrency), None)
+
+    before, after = peak(previous), peak(current)
+    if not before or not after:
+        return ["Nothing to compare: one of the runs has no peak stage."]
+    lines = [f"Peak: {before['rps']} -> {after['rps']} req/s at {before['concurrency']} -> {after['concurrency']} teachers"]
+    for endpoint, stats in after['endpoints'].items():
+        old = before['endpoints'].get(endpoint)
+        if old:
+            lines.append(f"{endpoint}: p95 {old['p95_ms']} -> {stats['p95_ms']} ms, p99 {old['p99_ms']} -> {stats['p99_ms']} ms")
+    return lines
@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biology_app.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = "Runs one of the built-in benchmarks and prints its measurements."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help=f"Benchmark to run: {', '.join(sorted(BENCHMARKS))}")
+        parser.add_argument('--size', type=int, help="Scales the benchmark (e.g. questions or students).")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        name = options['name']
+        if name not in BENCHMARKS:
+            raise CommandError(f"Choose a benchmark: {', '.join(sorted(BENCHMARKS))}")
+        kwargs = {'size': options['size']} if options['size'] else {}
+        results = BENCHMARKS[name](**kwargs)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        columns = list(results[0].keys()) if results else []
+        widths = {column: max(len(column), *(len(str(row[column])) for row in results)) for column in columns}
+        self.stdout.write('  '.join(column.ljust(widths[column]) for column in columns))
+        for row in results:
+            self.stdout.write('  '.join(str(row[column]).ljust(widths[column]) for column in columns))
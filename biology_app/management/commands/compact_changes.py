@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from biology_app.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = "Compacts the delta-sync change log and trims entries past the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGE_LOG_RETENTION_DAYS,
+                            help="Keep entries from the last N days.")
+
+    def handle(self, *args, **options):
+        superseded, trimmed = compact_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {superseded} superseded and {trimmed} expired entries."))
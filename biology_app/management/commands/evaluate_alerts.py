@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from biology_app.alerts import evaluate_students
+from biology_app.models import Student
+
+
+class Command(BaseCommand):
+    help = "Re-evaluates the at-risk rules for every student (or one class), e.g. after changing AT_RISK_RULES."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', dest='class_id', type=int, help="Only evaluate this class.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        students = Student.objects.order_by('id')
+        if options['class_id']:
+            students = students.filter(biology_class_id=options['class_id'])
+        student_ids = list(students.values_list('id', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(student_ids), batch_size):
+            evaluate_students(student_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Evaluated {len(student_ids)} students."))
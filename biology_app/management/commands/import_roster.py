@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biology_app.roster import import_roster, read_roster
+
+
+class Command(BaseCommand):
+    help = "Imports a class roster (CSV or XLSX of student names and class names), creating and moving students in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="A .csv or .xlsx file with 'name' (or 'first name'/'last name') and 'class' columns.")
+        parser.add_argument('--dry-run', action='store_true', help="Show what would change without writing anything.")
+        parser.add_argument('--sync', action='store_true', help="Also report students of the listed classes who are not in the file.")
+        parser.add_argument('--json', action='store_true', help="Print the full diff as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = read_roster(f, options['path'])
+        except Exception as e:
+            raise CommandError(str(e))
+        result = import_roster(rows, dry_run=options['dry_run'], sync=options['sync'])
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+
+        for name in result['new_classes']:
+            self.stdout.write(f"+ class {name}")
+        for row in result['created']:
+            self.stdout.write(f"+ {row['first_name']} {row['last_name']} ({row['class']})")
+        for row in result['moved']:
+            self.stdout.write(f"~ {row['first_name']} {row['last_name']}: {row['from']} -> {row['class']}")
+        for row in result['missing']:
+            self.stdout.write(f"? {row['first_name']} {row['last_name']} ({row['class']}) is not in the file")
+        for row in result['errors']:
+            self.stdout.write(self.style.WARNING(f"! row {row['row']}: {row['error']}"))
+        summary = result['summary']
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['rows']} rows: {summary['created']} new students, {summary['moved']} moved, "
+            f"{summary['unchanged']} unchanged, {summary['new_classes']} new classes, "
+            f"{summary['missing']} missing, {summary['errors']} errors."
+        ))
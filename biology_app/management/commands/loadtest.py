@@ -0,0 +1,79 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from biology_app import loadtest
+
+
+class Command(BaseCommand):
+    help = ("Replays weighted dashboard traffic against a running server, ramping up concurrent "
+            "teachers until it saturates, and writes the results to a JSON file.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', default=os.environ.get('LOADTEST_PASSWORD'),
+                            help="Defaults to the LOADTEST_PASSWORD environment variable.")
+        parser.add_argument('--concurrency', default='1,2,4,8,16,32',
+                            help="Comma-separated numbers of concurrent teachers, one stage each.")
+        parser.add_argument('--duration', type=float, default=20, help="Seconds per stage.")
+        parser.add_argument('--think', type=float, default=0, help="Seconds each teacher waits between scenarios.")
+        parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds.")
+        parser.add_argument('--max-p95', type=float, default=1000, help="A stage with a higher p95 (ms) counts as saturated.")
+        parser.add_argument('--full-ramp', action='store_true', help="Keep ramping after the saturation point.")
+        parser.add_argument('--read-only', action='store_true', help="Skip the score-saving scenario.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, so runs pick the same sequence.")
+        parser.add_argument('--output', help="Results file (defaults to loadtest-<timestamp>.json).")
+        parser.add_argument('--compare', help="An earlier results file to compare the peak stage with.")
+
+    def handle(self, *args, **options):
+        if not options['password']:
+            raise CommandError("Pass --password or set LOADTEST_PASSWORD.")
+        started_at = timezone.now()
+        try:
+            concurrency = [int(value) for value in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError("--concurrency must be a comma-separated list of numbers.")
+        config = {
+            'base_url': options['base_url'],
+            'username': options['username'],
+            'password': options['password'],
+            'concurrency': concurrency,
+            'duration': options['duration'],
+            'think': options['think'],
+            'timeout': options['timeout'],
+            'max_p95_ms': options['max_p95'],
+            'full_ramp': options['full_ramp'],
+            'read_only': options['read_only'],
+            'seed': options['seed'],
+            'started_at': started_at.isoformat(),
+        }
+        try:
+            results = loadtest.run(config, log=self.stdout.write)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        peak = results['saturation']
+        stage = next((stage for stage in results['stages'] if stage['concurrency'] == peak['concurrency']), None)
+        if stage:
+            self.stdout.write(f"\nPeak: {peak['rps']} req/s at {peak['concurrency']} teachers "
+                              f"(saturated at: {peak['saturated_at'] or 'not reached'}, {peak['reason']})")
+            for endpoint, stats in stage['endpoints'].items():
+                self.stdout.write(f"  {endpoint:<45} {stats['rps']:>8} req/s  p50 {stats['p50_ms']:>7}  "
+                                  f"p95 {stats['p95_ms']:>7}  p99 {stats['p99_ms']:>7} ms  errors {stats['errors']}")
+
+        if results['aborted']:
+            self.stdout.write(self.style.WARNING(f"The ramp stopped early. {results['aborted']}"))
+
+        output = options['output'] or f"loadtest-{started_at:%Y%m%d-%H%M%S}.json"
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+            for line in loadtest.compare(previous, results):
+                self.stdout.write(line)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from biology_app.coverage import refresh_coverage
+from biology_app.models import BiologyClass
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the standards coverage index, e.g. after editing questions or tests in the admin."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', dest='class_id', type=int, help="Only rebuild this class.")
+
+    def handle(self, *args, **options):
+        class_ids = [options['class_id']] if options['class_id'] else BiologyClass.objects.values_list('id', flat=True)
+        for class_id in class_ids:
+            refresh_coverage(class_id)
+        self.stdout.write(self.style.SUCCESS("Standards coverage rebuilt."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from biology_app import scheduler
+
+
+class Command(BaseCommand):
+    help = "Runs the periodic precompute tasks (cache warming, coverage, alerts, change log compaction)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the tasks that are due, then exit.")
+        parser.add_argument('--task', help="Run this one task now, whether or not it is due.")
+
+    def handle(self, *args, **options):
+        if options['task']:
+            if options['task'] not in scheduler.TASKS:
+                self.stderr.write(f"Unknown task. Choose from: {', '.join(scheduler.TASKS)}")
+                return
+            self._report(scheduler.run_task(options['task']))
+            return
+        if options['once']:
+            for name in scheduler.due_tasks():
+                self._report(scheduler.run_task(name))
+            return
+        self.stdout.write(f"Scheduler running {len(scheduler.TASKS)} tasks. Press Ctrl+C to stop.")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
+
+    def _report(self, run):
+        if run.succeeded:
+            self.stdout.write(self.style.SUCCESS(f"{run.task}: {run.duration_ms} ms"))
+        else:
+            self.stdout.write(self.style.ERROR(f"{run.task} failed: {run.error}"))
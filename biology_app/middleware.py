@@ -0,0 +1,100 @@
+# biology_app/middleware.py
+# Compresses API responses above COMPRESSION_MIN_SIZE bytes. The encoding is negotiated
+# from Accept-Encoding: brotli when the `brotli` package is installed and the client
+# accepts it, otherwise gzip. Streaming responses are compressed chunk by chunk.
+# Static files never get here (WhiteNoise serves its own precompressed copies), and
+# downloads such as report-pack ZIPs are left alone.
+# Brotli has no equivalent of the random gzip padding below, so responses that carry
+# secrets (the COMPRESSION_GZIP_ONLY_PATHS, e.g. the login response with its token) are
+# always sent as gzip.
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Same BREACH mitigation as Django's GZipMiddleware (random padding in the gzip header).
+GZIP_MAX_RANDOM_BYTES = 100
+
+
+def accepted_encodings(header):
+    # 'gzip, deflate, br;q=0.5' -> {'gzip', 'deflate', 'br'}; q=0 means "not acceptable".
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip().removeprefix('q=') if params.strip().startswith('q=') else '1'
+        try:
+            if float(quality) > 0:
+                encodings.add(name.strip().lower())
+        except ValueError:
+            continue
+    return encodings
+
+
+def choose_encoding(header, allow_brotli=True):
+    encodings = accepted_encodings(header)
+    if allow_brotli and brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for chunk in sequence:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.compress(request, response)
+
+    def compress(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if response.has_header('Content-Encoding') or not content_type.startswith(settings.COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        if response.streaming:
+            if response.is_async:
+                return response
+        elif len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        allow_brotli = not request.path.startswith(settings.COMPRESSION_GZIP_ONLY_PATHS)
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), allow_brotli)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # A compressed body is no longer byte-identical, so a strong ETag becomes weak.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
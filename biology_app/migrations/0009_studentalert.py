@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biology_app', '0008_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule', models.CharField(choices=[('latest_test', 'Latest test below threshold'), ('falling_trend', 'Falling trend over recent tests'), ('standard_mastery', 'Standard below mastery floor')], max_length=20)),
+                ('value', models.FloatField()),
+                ('message', models.CharField(max_length=255)),
+                ('is_active', models.BooleanField(default=True)),
+                ('raised_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cleared_at', models.DateTimeField(blank=True, null=True)),
+                ('standard', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='biology_app.standard')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='biology_app.student')),
+                ('test', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='biology_app.test')),
+            ],
+            options={
+                'ordering': ['-raised_at'],
+                'indexes': [models.Index(fields=['is_active', 'student'], name='biology_app_is_acti_f23ff0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biology_app', '0009_studentalert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('biology_class_id', models.BigIntegerField(db_index=True, null=True)),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('archive', 'Archived'), ('delete', 'Deleted')], max_length=10)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['model', 'object_id'], name='biology_app_model_3afaa7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_coverage(apps, schema_editor):
+    # The same aggregate as biology_app/coverage.py, written against the historical models.
+    Question = apps.get_model('biology_app', 'Question')
+    StandardCoverage = apps.get_model('biology_app', 'StandardCoverage')
+    totals = (Question.objects.filter(test__is_archived=False)
+              .exclude(standards=None)
+              .values('test__assigned_class_id', 'standards')
+              .annotate(tests=Count('test', distinct=True), marks=Sum('max_mark'), last=Max('test__date_administered')))
+    StandardCoverage.objects.bulk_create([
+        StandardCoverage(biology_class_id=row['test__assigned_class_id'], standard_id=row['standards'],
+                         assessment_count=row['tests'], total_marks=row['marks'] or 0, last_assessed=row['last'])
+        for row in totals
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biology_app', '0010_changelogentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandardCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assessment_count', models.PositiveIntegerField(default=0)),
+                ('total_marks', models.PositiveIntegerField(default=0)),
+                ('last_assessed', models.DateField(blank=True, null=True)),
+                ('biology_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverage', to='biology_app.biologyclass')),
+                ('standard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverage', to='biology_app.standard')),
+            ],
+            options={
+                'unique_together': {('biology_class', 'standard')},
+            },
+        ),
+        migrations.RunPython(backfill_coverage, migrations.RunPython.noop),
+    ]
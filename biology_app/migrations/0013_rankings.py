@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biology_app', '0012_scheduledtaskrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='biologyclass',
+            name='level',
+            field=models.CharField(blank=True, choices=[('IGCSE', 'IGCSE'), ('AS', 'AS Level'), ('A2', 'A Level')], max_length=5),
+        ),
+        migrations.CreateModel(
+            name='RankingIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('test', 'Test'), ('cohort', 'Cohort')], max_length=10)),
+                ('key', models.CharField(max_length=50)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('scope', 'key')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RankingEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('percentage', models.FloatField()),
+                ('ranking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='biology_app.rankingindex')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_entries', to='biology_app.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ranking', 'percentage', 'student'], name='biology_app_ranking_0e8c33_idx')],
+                'unique_together': {('ranking', 'student')},
+            },
+        ),
+    ]
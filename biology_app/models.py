@@ -1,10 +1,18 @@
 # biology_app/models.py
 from django.db import models
 
+LEVEL_CHOICES = [
+    ('IGCSE', 'IGCSE'),
+    ('AS', 'AS Level'),
+    ('A2', 'A Level'),
+]
+
 # Represents a class, e.g., "Year 9 (iCGSE)"
 class BiologyClass(models.Model):
     name = models.CharField(max_length=100, unique=True) # e.g., "Year 9 (iCGSE)"
     description = models.TextField(blank=True)
+    # Classes at the same level form a cohort (year group) for rankings. Blank: the class is its own cohort.
+    level = models.CharField(max_length=5, choices=LEVEL_CHOICES, blank=True)
 
     def __str__(self):
         return self.name
@@ -25,11 +33,7 @@ class Student(models.Model):
 # ... (other models like BiologyClass, Student should be above this) ...
 
 class Standard(models.Model):
-    LEVEL_CHOICES = [
-        ('IGCSE', 'IGCSE'),
-        ('AS', 'AS Level'),
-        ('A2', 'A Level'),
-    ]
+    LEVEL_CHOICES = LEVEL_CHOICES
 
     level = models.CharField(max_length=5, choices=LEVEL_CHOICES)
     
@@ -112,4 +116,164 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"Comment for {self.student} on {self.created_at.strftime('%Y-%m-%d')}"
-    
\ No newline at end of file
+    
+
+# A monotonically increasing stamp for data that workers keep cached in memory.
+# Bumping a key tells every worker that its copy is stale.
+class CacheVersion(models.Model):
+    key = models.CharField(max_length=50, unique=True) # e.g., "standards"
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+# A background job that renders a report pack (one report per student) for a class
+class ReportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    biology_class = models.ForeignKey(BiologyClass, related_name='report_jobs', on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    include_pdf = models.BooleanField(default=False)
+    progress = models.PositiveIntegerField(default=0) # Students rendered so far
+    total = models.PositiveIntegerField(default=0)
+    # The finished ZIP. It is kept in the database so that any instance can serve the download.
+    archive = models.BinaryField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Saved with every progress update, so a job whose worker died can be told apart from a slow one.
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Report pack for {self.biology_class.name} ({self.status})"
+
+# A flag raised on a student by the at-risk rules (see biology_app/alerts.py).
+# Active rows are the current flags; cleared rows keep the history of transitions.
+class StudentAlert(models.Model):
+    RULE_CHOICES = [
+        ('latest_test', 'Latest test below threshold'),
+        ('falling_trend', 'Falling trend over recent tests'),
+        ('standard_mastery', 'Standard below mastery floor'),
+    ]
+
+    student = models.ForeignKey(Student, related_name='alerts', on_delete=models.CASCADE)
+    rule = models.CharField(max_length=20, choices=RULE_CHOICES)
+    # Only set for 'standard_mastery' alerts.
+    standard = models.ForeignKey(Standard, null=True, blank=True, on_delete=models.CASCADE)
+    # The test that tripped the rule, where there is one.
+    test = models.ForeignKey(Test, null=True, blank=True, on_delete=models.SET_NULL)
+    value = models.FloatField() # The percentage (or drop in points) that tripped the rule
+    message = models.CharField(max_length=255)
+    is_active = models.BooleanField(default=True)
+    raised_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    cleared_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-raised_at']
+        indexes = [models.Index(fields=['is_active', 'student'])]
+
+    def __str__(self):
+        return f"{self.get_rule_display()} for {self.student}"
+
+# Append-only log of changes to the synced models. `seq` only ever grows, so clients
+# can ask for everything after the last seq they saw (see biology_app/changes.py).
+class ChangeLogEntry(models.Model):
+    ACTION_CHOICES = [
+        ('upsert', 'Created or updated'),
+        ('archive', 'Archived'),
+        ('delete', 'Deleted'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20) # e.g., "score"
+    object_id = models.BigIntegerField()
+    # Not a ForeignKey: entries must outlive the class they describe.
+    biology_class_id = models.BigIntegerField(null=True, db_index=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Identifying fields of deleted rows (e.g. student and question for a score).
+    data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['model', 'object_id']),
+            # Serves the feed filtered to one class (?class=).
+            models.Index(fields=['biology_class_id', 'seq']),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.model} {self.object_id}"
+
+# How much a class has been assessed on each standard, across its active tests.
+# Kept up to date by biology_app/coverage.py whenever questions or tests change.
+class StandardCoverage(models.Model):
+    biology_class = models.ForeignKey(BiologyClass, related_name='coverage', on_delete=models.CASCADE)
+    standard = models.ForeignKey(Standard, related_name='coverage', on_delete=models.CASCADE)
+    assessment_count = models.PositiveIntegerField(default=0) # Number of tests that assess it
+    total_marks = models.PositiveIntegerField(default=0)
+    last_assessed = models.DateField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('biology_class', 'standard')
+
+    def __str__(self):
+        return f"{self.standard.code} in {self.biology_class.name}: {self.assessment_count} tests"
+
+# One run of a scheduled task (see biology_app/scheduler.py).
+class ScheduledTaskRun(models.Model):
+    task = models.CharField(max_length=50, db_index=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    succeeded = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.task} at {self.started_at:%Y-%m-%d %H:%M}"
+
+# A persisted ranking of students' percentages, either on one test or across the active
+# tests of a cohort. Its entries are RankingEntry rows. Maintained by biology_app/rankings.py.
+class RankingIndex(models.Model):
+    SCOPE_CHOICES = [
+        ('test', 'Test'),
+        ('cohort', 'Cohort'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    key = models.CharField(max_length=50) # The test id, or the cohort key, e.g. "level:AS"
+    size = models.PositiveIntegerField(default=0) # Number of entries, kept in step by rankings.py
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('scope', 'key')
+
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.size} students)"
+
+
+# One student's percentage in a RankingIndex. Ranks are range counts and top/bottom-k are
+# ordered scans over the (ranking, percentage) index, so no read loads the whole ranking.
+class RankingEntry(models.Model):
+    ranking = models.ForeignKey(RankingIndex, on_delete=models.CASCADE, related_name='entries')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='ranking_entries')
+    percentage = models.FloatField()
+
+    class Meta:
+        unique_together = ('ranking', 'student')
+        indexes = [
+            models.Index(fields=['ranking', 'percentage', 'student']),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} at {self.percentage}% in {self.ranking_id}"
@@ -0,0 +1,60 @@
+# biology_app/providers.py
+# Heavy optional dependencies are imported on first use instead of at worker boot.
+# Add new analytics/AI libraries to HEAVY_MODULES and reach them through `load()`.
+import importlib
+import importlib.util
+import threading
+
+from django.conf import settings
+
+HEAVY_MODULES = {
+    'genai': 'google.generativeai',
+    'pandas': 'pandas',
+    # Optional: only installed where PDF report packs are wanted.
+    'weasyprint': 'weasyprint',
+}
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def _configure_genai(module):
+    module.configure(api_key=settings.GOOGLE_API_KEY)
+
+
+# One-off setup run right after a provider is first imported.
+SETUP = {
+    'genai': _configure_genai,
+}
+
+
+def load(name):
+    module = _loaded.get(name)
+    if module is None:
+        with _lock:
+            module = _loaded.get(name)
+            if module is None:
+                module = importlib.import_module(HEAVY_MODULES[name])
+                if name in SETUP:
+                    SETUP[name](module)
+                _loaded[name] = module
+    return module
+
+
+def available(name):
+    # True if the provider is importable here, without importing it.
+    return name in _loaded or importlib.util.find_spec(HEAVY_MODULES[name].split('.')[0]) is not None
+
+
+def genai():
+    return load('genai')
+
+
+def pandas():
+    return load('pandas')
+
+
+def warmup(names=None):
+    # Preloads the given providers (all of them by default), e.g. before gunicorn forks workers.
+    for name in names or [name for name in HEAVY_MODULES if available(name)]:
+        load(name)
@@ -0,0 +1,210 @@
+# biology_app/rankings.py
+# Where a student sits on a test and in their cohort (the classes at the same level).
+# Each ranking is a RankingIndex with one RankingEntry row per student, indexed by
+# (ranking, percentage). A rank is one range count on that index, and top/bottom-k are
+# ordered scans that stop after k rows. No read loads or sorts the whole ranking.
+# The range count is not O(log n): it walks the index entries above the student, so it is
+# O(n - rank). In SQLite this measured 0.5 ms for any rank among 1,000 students, and
+# 0.3 ms (top) to 4 ms (bottom) among 100,000. Cohorts are a few hundred students, so an
+# O(log n) structure (such as a Fenwick tree over percentage buckets, which costs about
+# 2 log n row writes per score change) is not worth it here.
+# Saving scores writes only the entries of the students who changed (see update_students),
+# whether through bulk score entry or a single Score save (the admin, see signals.py).
+# Structural changes, such as question marks, archiving or students moving class through
+# the API, drop the affected indexes; they are rebuilt with one aggregate query on their
+# next read. New students join a ranking with their first score. Other admin edits (moving
+# or deleting a student, deleting scores) are only picked up when the indexes are next
+# dropped, at the latest by the daily reset_rankings task.
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import BiologyClass, RankingEntry, RankingIndex, Score, Student, Test
+
+
+def _percentage(awarded, possible):
+    return round(awarded * 100.0 / possible, 2) if possible else 0.0
+
+
+class Ranking:
+    def __init__(self, index):
+        self.index = index
+        self.entries = RankingEntry.objects.filter(ranking=index)
+
+    def __len__(self):
+        return self.index.size
+
+    def rank_of(self, percentage):
+        # Competition ranking: 1 + the number of students with a strictly higher percentage.
+        return self.entries.filter(percentage__gt=percentage).count() + 1
+
+    def top(self, k):
+        # [(percentage, student_id, rank)], highest first. Every student above an entry is
+        # earlier in the list, so ranks come from the list itself.
+        rows = list(self.entries.order_by('-percentage', '-student_id').values_list('percentage', 'student_id')[:k])
+        first_place = {}
+        for place, (percentage, _) in enumerate(rows, 1):
+            first_place.setdefault(percentage, place)
+        return [(percentage, student_id, first_place[percentage]) for percentage, student_id in rows]
+
+    def bottom(self, k):
+        # [(percentage, student_id, rank)], lowest first. Everyone at or below an entry is in
+        # the list, except for ties on its highest percentage, which may run past the end.
+        rows = list(self.entries.order_by('percentage', 'student_id').values_list('percentage', 'student_id')[:k])
+        at_or_below = {percentage: place for place, (percentage, _) in enumerate(rows, 1)}
+        if rows and len(rows) < len(self):
+            highest = rows[-1][0]
+            at_or_below[highest] = len(self) - self.rank_of(highest) + 1
+        return [(percentage, student_id, len(self) - at_or_below[percentage] + 1) for percentage, student_id in rows]
+
+    def position(self, student_id):
+        percentage = self.entries.filter(student_id=student_id).values_list('percentage', flat=True).first()
+        if percentage is None:
+            return None
+        rank = self.rank_of(percentage)
+        return {
+            'percentage': percentage,
+            'rank': rank,
+            'of': len(self),
+            # The share of the group scoring at or below this student.
+            'percentile': round((len(self) - rank + 1) * 100.0 / len(self), 1),
+        }
+
+
+# --- Percentages ---
+
+def test_percentages(test_id, student_ids=None):
+    # Students without a score on the test are not ranked on it.
+    scores = Score.objects.filter(question__test_id=test_id)
+    if student_ids is not None:
+        scores = scores.filter(student_id__in=student_ids)
+    rows = scores.values('student_id').annotate(awarded=Sum('mark_awarded'), possible=Sum('question__max_mark'))
+    return {row['student_id']: _percentage(row['awarded'], row['possible']) for row in rows}
+
+
+def cohort_percentages(class_ids, student_ids=None):
+    # Overall percentage across each student's active tests.
+    scores = Score.objects.filter(student__biology_class_id__in=class_ids, question__test__is_archived=False)
+    if student_ids is not None:
+        scores = scores.filter(student_id__in=student_ids)
+    rows = scores.values('student_id').annotate(awarded=Sum('mark_awarded'), possible=Sum('question__max_mark'))
+    return {row['student_id']: _percentage(row['awarded'], row['possible']) for row in rows}
+
+
+def cohort_key(level, class_id):
+    return f'level:{level}' if level else f'class:{class_id}'
+
+
+def cohort_class_ids(key):
+    kind, value = key.split(':', 1)
+    if kind == 'level':
+        return list(BiologyClass.objects.filter(level=value).values_list('id', flat=True))
+    return [int(value)]
+
+
+# --- Persisted indexes ---
+
+def _load(scope, key, build):
+    index = RankingIndex.objects.filter(scope=scope, key=key).first()
+    if index is None:
+        index = _build(scope, key, build())
+    return Ranking(index)
+
+
+@transaction.atomic
+def _build(scope, key, percentages):
+    # A concurrent build of the same index waits on the unique (scope, key) row and then uses it.
+    index, created = RankingIndex.objects.get_or_create(scope=scope, key=key, defaults={'size': len(percentages)})
+    if created:
+        RankingEntry.objects.bulk_create([
+            RankingEntry(ranking=index, student_id=student_id, percentage=percentage)
+            for student_id, percentage in percentages.items()
+        ], batch_size=1000)
+    return index
+
+
+def test_ranking(test_id):
+    return _load('test', str(test_id), lambda: test_percentages(test_id))
+
+
+def cohort_ranking(biology_class):
+    key = cohort_key(biology_class.level, biology_class.pk)
+    return _load('cohort', key, lambda: cohort_percentages(cohort_class_ids(key)))
+
+
+def _apply(index, percentages, student_ids):
+    # Upserts the students that have a percentage and removes the rest, keeping size in step.
+    entries = RankingEntry.objects.filter(ranking=index)
+    ranked = set(entries.filter(student_id__in=student_ids).values_list('student_id', flat=True))
+    removed = ranked - set(percentages)
+    if removed:
+        entries.filter(student_id__in=removed).delete()
+    if percentages:
+        RankingEntry.objects.bulk_create(
+            [RankingEntry(ranking=index, student_id=student_id, percentage=percentage) for student_id, percentage in percentages.items()],
+            update_conflicts=True, unique_fields=['ranking', 'student'], update_fields=['percentage'],
+        )
+    RankingIndex.objects.filter(pk=index.pk).update(
+        size=F('size') + len(set(percentages) - ranked) - len(removed), updated_at=timezone.now())
+
+
+@transaction.atomic
+def update_students(student_ids, test_ids):
+    # Moves these students within the test and cohort indexes after their scores change.
+    # Indexes that were never built are left alone; they are built on first read.
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+    for index in RankingIndex.objects.select_for_update().filter(scope='test', key__in=[str(test_id) for test_id in test_ids]):
+        _apply(index, test_percentages(int(index.key), student_ids), student_ids)
+
+    students_by_cohort = {}
+    for student_id, class_id, level in Student.objects.filter(pk__in=student_ids).values_list('id', 'biology_class_id', 'biology_class__level'):
+        students_by_cohort.setdefault(cohort_key(level, class_id), set()).add(student_id)
+    for index in RankingIndex.objects.select_for_update().filter(scope='cohort', key__in=list(students_by_cohort)):
+        cohort_students = students_by_cohort[index.key]
+        _apply(index, cohort_percentages(cohort_class_ids(index.key), cohort_students), cohort_students)
+
+
+def invalidate_class(class_id):
+    invalidate_classes([class_id])
+
+
+def invalidate_classes(class_ids):
+    # Drops the classes' test indexes and their cohort indexes.
+    cohort_keys = [cohort_key(level, class_id) for class_id, level in BiologyClass.objects.filter(pk__in=class_ids).values_list('id', 'level')]
+    test_keys = [str(test_id) for test_id in Test.all_objects.filter(assigned_class_id__in=class_ids).values_list('id', flat=True)]
+    RankingIndex.objects.filter(scope='test', key__in=test_keys).delete()
+    RankingIndex.objects.filter(scope='cohort', key__in=cohort_keys).delete()
+
+
+def invalidate_cohort(level, class_id):
+    RankingIndex.objects.filter(scope='cohort', key=cohort_key(level, class_id)).delete()
+
+
+# --- Payloads ---
+
+def ranked_students(entries):
+    # Rows for a top/bottom-k list, with student names (one query).
+    names = {
+        student['id']: f"{student['first_name']} {student['last_name']}"
+        for student in Student.objects.filter(pk__in=[student_id for _, student_id, _ in entries]).values('id', 'first_name', 'last_name')
+    }
+    return [
+        {'student_id': student_id, 'name': names.get(student_id, ''), 'percentage': percentage, 'rank': rank}
+        for percentage, student_id, rank in entries
+    ]
+
+
+def student_positions(student):
+    # The student's place on their class's latest active test and in their cohort.
+    latest_test = Test.objects.filter(assigned_class_id=student.biology_class_id).order_by('-date_administered').first()
+    biology_class = student.biology_class
+    return {
+        'latest_test': latest_test and dict(test_id=latest_test.pk, title=latest_test.title,
+                                            position=test_ranking(latest_test.pk).position(student.pk)),
+        'cohort': {
+            'level': biology_class.level or None,
+            'position': cohort_ranking(biology_class).position(student.pk),
+        },
+    }
@@ -0,0 +1,54 @@
+# biology_app/renderers.py
+# JSON rendering and parsing with orjson when it is installed, otherwise with the
+# stdlib json module (the same output as DRF's own JSONRenderer). Hot read endpoints
+# can also skip serializers entirely: they build plain dicts from values() and
+# return them with json_response().
+from django.http import HttpResponse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Anything orjson does not handle natively (lazy strings, Decimals, querysets, ...)
+    # is converted the way DRF's encoder converts it.
+    return _encoder.default(obj)
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return JSONRenderer().render(data)
+
+
+def json_response(data, status=200):
+    # A response built straight from plain Python data, with no serializer or renderer pass.
+    return HttpResponse(data if isinstance(data, bytes) else dumps(data), status=status, content_type='application/json')
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Indented output (the browsable API, or ?indent= in the Accept header) stays on DRF's path.
+        if orjson is None or data is None or self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,23 @@
+# biology_app/report_worker.py
+# Runs inside report-pack pool processes. Those are spawned fresh, so this module
+# must stay importable before Django is set up (no model imports here).
+import django
+from django.apps import apps
+from django.template.loader import render_to_string
+
+from . import providers
+
+
+def init_worker():
+    if not apps.ready:
+        django.setup()
+
+
+def render_report(context, include_pdf):
+    html = render_to_string('reports/student_report.html', context)
+    pdf = providers.load('weasyprint').HTML(string=html).write_pdf() if include_pdf else None
+    return context['filename'], html, pdf
+
+
+def render_chunk(contexts, include_pdf):
+    return [render_report(context, include_pdf) for context in contexts]
@@ -0,0 +1,171 @@
+# biology_app/reports.py
+# Report packs: one progress report per student of a class, bundled into a ZIP.
+# Data is gathered in a fixed number of queries; PDFs are rendered in a process pool.
+import io
+import math
+import multiprocessing
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from . import providers
+from .catalogue import get_standards_catalogue
+from .models import Comment, ReportJob, Score, Student, Test
+from .report_worker import init_worker, render_chunk, render_report
+
+
+def _percentage(awarded, possible):
+    return (awarded * 100.0 / possible) if possible else 0.0
+
+
+def gather_class_reports(biology_class):
+    # Five queries (plus the cached standards catalogue), however many students, tests or comments the class has.
+    catalogue = get_standards_catalogue()
+    students = list(
+        Student.objects.filter(biology_class=biology_class)
+        .order_by('last_name', 'first_name')
+        .values('id', 'first_name', 'last_name')
+    )
+    tests = {
+        test['id']: test for test in
+        Test.objects.filter(assigned_class=biology_class).values('id', 'title', 'date_administered')
+    }
+    active_scores = Score.objects.filter(student__biology_class=biology_class, question__test__is_archived=False)
+
+    standards_by_student = {}
+    for row in (active_scores.exclude(question__standards=None)
+                .values('student_id', 'question__standards')
+                .annotate(awarded=Sum('mark_awarded'), possible=Sum('question__max_mark'))):
+        standards_by_student.setdefault(row['student_id'], {})[row['question__standards']] = row
+
+    tests_by_student = {}
+    for row in (active_scores.values('student_id', 'question__test_id')
+                .annotate(awarded=Sum('mark_awarded'), possible=Sum('question__max_mark'))):
+        test = tests.get(row['question__test_id'])
+        if test:
+            tests_by_student.setdefault(row['student_id'], []).append({
+                'title': test['title'],
+                'date_administered': test['date_administered'],
+                'awarded': row['awarded'],
+                'possible': row['possible'],
+                'percentage': _percentage(row['awarded'], row['possible']),
+            })
+
+    comments_by_student = {}
+    latest_comments = Comment.objects.filter(student__biology_class=biology_class).annotate(
+        rank=Window(RowNumber(), partition_by=F('student_id'), order_by=F('created_at').desc())
+    ).filter(rank__lte=settings.REPORT_PACK_COMMENTS).values('student_id', 'text', 'created_at')
+    for row in latest_comments:
+        comments_by_student.setdefault(row['student_id'], []).append(row)
+
+    generated_at = timezone.now()
+    reports = []
+    for number, student in enumerate(students, start=1):
+        student_standards = standards_by_student.get(student['id'], {})
+        name = f"{student['last_name']}-{student['first_name']}"
+        reports.append({
+            'filename': f"{number:03d}-{re.sub(r'[^A-Za-z0-9_-]+', '_', name)}",
+            'class_name': biology_class.name,
+            'student': student,
+            # Catalogue order keeps the standards in syllabus order.
+            'standards': [
+                {**standard, 'percentage': _percentage(student_standards[standard['id']]['awarded'],
+                                                       student_standards[standard['id']]['possible'])}
+                for standard in catalogue.rows if standard['id'] in student_standards
+            ],
+            'tests': sorted(tests_by_student.get(student['id'], []), key=lambda test: test['date_administered'], reverse=True),
+            'comments': sorted(comments_by_student.get(student['id'], []), key=lambda comment: comment['created_at'], reverse=True),
+            'generated_at': generated_at,
+        })
+    return reports
+
+
+def render_reports(contexts, include_pdf, use_pool=None):
+    # Yields (filename, html, pdf) for each report as soon as it is rendered.
+    # HTML renders in milliseconds, so only PDF packs are worth the pool's start-up cost.
+    workers = settings.REPORT_PACK_WORKERS
+    if use_pool is None:
+        use_pool = include_pdf and workers > 1 and len(contexts) >= settings.REPORT_PACK_POOL_THRESHOLD
+    if not use_pool:
+        for context in contexts:
+            yield render_report(context, include_pdf)
+        return
+    # A few chunks per worker keeps IPC overhead low while still reporting progress often.
+    chunk_size = max(1, math.ceil(len(contexts) / (workers * 4)))
+    chunks = [contexts[i:i + chunk_size] for i in range(0, len(contexts), chunk_size)]
+    # 'spawn' rather than fork: the pool is started from a thread of a multi-threaded server.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=init_worker) as pool:
+        futures = [pool.submit(render_chunk, chunk, include_pdf) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def build_report_pack(job):
+    job.status = 'running'
+    job.save(update_fields=['status', 'updated_at'])
+    try:
+        contexts = gather_class_reports(job.biology_class)
+        job.total = len(contexts)
+        job.save(update_fields=['total', 'updated_at'])
+
+        # Built in memory and saved in one go, so a failed or killed job leaves no partial archive behind.
+        buffer = io.BytesIO()
+        last_saved = time.monotonic()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for filename, html, pdf in render_reports(contexts, job.include_pdf):
+                archive.writestr(f'{filename}.html', html)
+                if pdf:
+                    archive.writestr(f'{filename}.pdf', pdf)
+                job.progress += 1
+                # Progress is saved at most twice a second, not once per student.
+                if time.monotonic() - last_saved > 0.5:
+                    job.save(update_fields=['progress', 'updated_at'])
+                    last_saved = time.monotonic()
+
+        job.archive = buffer.getvalue()
+        job.status = 'done'
+    except Exception as e:
+        print(f"Report pack {job.pk} failed: {e}")
+        job.archive = None
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def fail_stale_report_packs():
+    # Jobs run in a thread of the web worker. If the worker is recycled or killed mid-run,
+    # the job stops saving progress; it is marked failed so that clients stop polling it.
+    cutoff = timezone.now() - timedelta(seconds=settings.REPORT_PACK_STALE_SECONDS)
+    return ReportJob.objects.filter(status__in=['pending', 'running'], updated_at__lt=cutoff).update(
+        status='failed', error='The report pack stopped responding. Please generate it again.',
+        archive=None, finished_at=timezone.now(), updated_at=timezone.now(),
+    )
+
+
+def _run_report_job(job_id):
+    try:
+        build_report_pack(ReportJob.objects.select_related('biology_class').get(pk=job_id))
+    finally:
+        connection.close()
+
+
+def start_report_pack(biology_class, include_pdf=False):
+    job = ReportJob.objects.create(
+        biology_class=biology_class,
+        # PDFs are only produced where a local renderer is installed.
+        include_pdf=include_pdf and providers.available('weasyprint'),
+    )
+    threading.Thread(target=_run_report_job, args=(job.pk,), name=f'report-pack-{job.pk}', daemon=True).start()
+    return job
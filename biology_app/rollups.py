@@ -0,0 +1,111 @@
+# biology_app/rollups.py
+# Cached aggregates behind dashboard_stats and the class details page.
+# A cached payload is tagged with its classes' version stamps (see changes.py), read
+# before it is built. Every logged score, student, test, question or comment change
+# bumps the stamp in the same transaction, so a stale payload is never served.
+# The scheduler's warm-up tasks rebuild them ahead of time.
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Avg, Case, F, FloatField, Q, Sum, When
+
+from .catalogue import get_version
+from .changes import class_version_key
+from .models import BiologyClass, CacheVersion, Score, Student, Test
+from .serializers import StudentDetailSerializer
+
+
+def _cache():
+    return caches[settings.ROLLUP_CACHE]
+
+
+def _cached(key, version, build, refresh=False):
+    hit = None if refresh else _cache().get(key)
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    payload = build()
+    _cache().set(key, (version, payload), timeout=settings.ROLLUP_CACHE_TTL)
+    return payload
+
+
+def class_version(class_id):
+    return get_version(class_version_key(class_id))
+
+
+def build_class_details(biology_class):
+    latest_test = Test.objects.filter(assigned_class=biology_class).order_by('-date_administered').first()
+    students_in_class = Student.objects.filter(biology_class=biology_class).order_by('first_name', 'last_name')
+    students = [dict(student) for student in StudentDetailSerializer(students_in_class, many=True).data]
+    if not latest_test:
+        return {'students': students, 'summary': {"message": "No tests found for this class."}}
+    active_test_filter = Q(score__question__test__is_archived=False)
+
+    students_performance = Student.objects.filter(
+        biology_class=biology_class
+    ).annotate(
+        total_awarded=Sum('score__mark_awarded', filter=Q(score__question__test=latest_test) & (active_test_filter)),
+        total_possible=Sum('score__question__max_mark', filter=Q(score__question__test=latest_test)&(active_test_filter)),
+        percentage=Case(When(total_possible__gt=0, then=(F('total_awarded') * 100.0) / F('total_possible')), default=0.0, output_field=FloatField())
+    ).order_by('-percentage')
+    average_data = students_performance.aggregate(avg_percent=Avg('percentage'))
+    average_score_percentage = round(average_data['avg_percent'] or 0, 2)
+    red_flag_count = students_performance.filter(percentage__lt=settings.AT_RISK_RULES['LATEST_TEST_THRESHOLD']).count()
+    bins = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+    labels = [f"{bins[i]}-{bins[i+1]}%" for i in range(len(bins)-1)]
+    histogram_counts = {label: 0 for label in labels}
+    for student in students_performance:
+        percentage = student.percentage
+        for i in range(len(bins) - 1):
+            if bins[i] <= percentage < bins[i+1] or (i == len(bins) - 2 and percentage == 100):
+                histogram_counts[labels[i]] += 1
+                break
+    histogram_data = {'labels': list(histogram_counts.keys()), 'data': list(histogram_counts.values())}
+    summary_payload = {
+        "latest_test_title": latest_test.title,
+        "test_file_link": latest_test.test_file_link,
+        "average_score_percentage": average_score_percentage,
+        "red_flag_count": red_flag_count,
+        "histogram_data": histogram_data
+    }
+    return {'students': students, 'summary': summary_payload}
+
+
+def class_details(biology_class, refresh=False):
+    # The students and summary of the class details page (class_info is always read fresh).
+    return _cached(f'class-details:{biology_class.pk}', class_version(biology_class.pk),
+                   lambda: build_class_details(biology_class), refresh=refresh)
+
+
+def build_dashboard(all_classes):
+    class_averages = []
+    for bio_class in all_classes:
+        latest_test = Test.objects.filter(assigned_class=bio_class).order_by('-date_administered').first()
+        if latest_test:
+            avg_data = Score.objects.filter(
+                question__test=latest_test, question__test__is_archived=False
+            ).aggregate(
+                avg_percent=Avg(
+                    (F('mark_awarded') * 100.0) / F('question__max_mark'),
+                    output_field=FloatField()
+                )
+            )
+            average_score = round(avg_data.get('avg_percent') or 0, 1)
+        else:
+            average_score = 0
+        class_averages.append({
+            'class_name': bio_class.name,
+            'average_score': average_score
+        })
+    chart_data = {
+        'labels': [item['class_name'] for item in class_averages],
+        'data': [item['average_score'] for item in class_averages]
+    }
+    return {'class_performance_chart': chart_data}
+
+
+def dashboard(refresh=False):
+    all_classes = list(BiologyClass.objects.all().order_by('name'))
+    keys = {bio_class.pk: class_version_key(bio_class.pk) for bio_class in all_classes}
+    stamps = dict(CacheVersion.objects.filter(key__in=keys.values()).values_list('key', 'version'))
+    # Class names are part of the version, since renaming a class is not in the change log.
+    version = tuple((bio_class.pk, bio_class.name, stamps.get(keys[bio_class.pk], 0)) for bio_class in all_classes)
+    return _cached('dashboard', version, lambda: build_dashboard(all_classes), refresh=refresh)
@@ -0,0 +1,191 @@
+# biology_app/roster.py
+# Bulk roster import: a CSV or XLSX of student names and class names. Students are matched
+# by name across the whole school: a new name is created, and a known name listed under
+# another class is moved there. Missing classes are created. The work is done in a fixed
+# number of queries, however long the file:
+# - one read of the classes and one of the students
+# - batched bulk_create and bulk_update for the writes
+# - a bulk insert into the change log
+# Sync mode also reports students of the listed classes who are not in the file. They are
+# never deleted.
+import csv
+import io
+
+from django.db import transaction
+
+from . import providers, rankings
+from .changes import log_changes
+from .models import BiologyClass, Student
+
+NAME_COLUMNS = ('name', 'student', 'student name', 'full name')
+CLASS_COLUMNS = ('class', 'class name', 'biology class')
+
+BATCH_SIZE = 1000
+
+# Longer values would fail the whole batch insert, so they are row errors instead.
+NAME_MAX_LENGTH = Student._meta.get_field('first_name').max_length
+CLASS_NAME_MAX_LENGTH = BiologyClass._meta.get_field('name').max_length
+
+
+def _normalise(value):
+    return ' '.join(str(value or '').split())
+
+
+def _key(*parts):
+    return tuple(part.casefold() for part in parts)
+
+
+def split_name(name):
+    # "Last, First" or "First [Middle] Last".
+    if ',' in name:
+        last, first = (_normalise(part) for part in name.split(',', 1))
+    else:
+        first, _, last = name.rpartition(' ')
+    return first, last
+
+
+def read_roster(uploaded_file, filename):
+    # Returns (row_number, first_name, last_name, class_name) tuples. Row numbers match the
+    # spreadsheet, counting the header as row 1.
+    if filename.lower().endswith('.xlsx'):
+        frame = providers.pandas().read_excel(uploaded_file, dtype=str).fillna('')
+        header = list(frame.columns)
+        records = frame.itertuples(index=False, name=None)
+    elif filename.lower().endswith('.csv'):
+        content = uploaded_file.read()
+        text = content.decode('utf-8-sig') if isinstance(content, bytes) else content
+        reader = csv.reader(io.StringIO(text))
+        header = next(reader, [])
+        records = reader
+    else:
+        raise ValueError("Unsupported file format. Please upload a .xlsx or .csv file.")
+
+    columns = {_normalise(column).casefold(): i for i, column in enumerate(header)}
+    class_column = next((columns[name] for name in CLASS_COLUMNS if name in columns), None)
+    name_column = next((columns[name] for name in NAME_COLUMNS if name in columns), None)
+    split_columns = (columns.get('first name', columns.get('first_name')), columns.get('last name', columns.get('last_name')))
+    if class_column is None or (name_column is None and None in split_columns):
+        raise ValueError("The file needs a 'class' column and either a 'name' column or 'first name' and 'last name' columns.")
+
+    rows = []
+    for row_number, record in enumerate(records, start=2):
+        record = list(record)
+
+        def cell(index):
+            return _normalise(record[index]) if index < len(record) else ''
+
+        if name_column is not None:
+            first_name, last_name = split_name(cell(name_column))
+        else:
+            first_name, last_name = cell(split_columns[0]), cell(split_columns[1])
+        rows.append((row_number, first_name, last_name, cell(class_column)))
+    return rows
+
+
+def plan_import(rows, sync=False):
+    # Works out the diff against the database (two queries) without writing anything.
+    classes = {_key(name): (pk, name) for pk, name in BiologyClass.objects.values_list('id', 'name')}
+    class_names = {pk: name for pk, name in classes.values()}
+    existing = {}
+    for pk, first_name, last_name, class_id in Student.objects.values_list('id', 'first_name', 'last_name', 'biology_class_id'):
+        existing.setdefault(_key(first_name, last_name), []).append((pk, class_id, first_name, last_name))
+
+    plan = {'new_classes': [], 'create': [], 'move': [], 'unchanged': 0, 'missing': [], 'errors': []}
+    seen_students, seen_names, listed_classes = set(), {}, set()
+    for row_number, first_name, last_name, class_name in rows:
+        if not (first_name or last_name or class_name):
+            continue  # Blank line.
+        if not first_name or not last_name or not class_name:
+            plan['errors'].append({'row': row_number, 'error': "A first name, last name and class are all required."})
+            continue
+        if max(len(first_name), len(last_name)) > NAME_MAX_LENGTH:
+            plan['errors'].append({'row': row_number, 'error': f"First and last names can be at most {NAME_MAX_LENGTH} characters."})
+            continue
+        if len(class_name) > CLASS_NAME_MAX_LENGTH:
+            plan['errors'].append({'row': row_number, 'error': f"Class names can be at most {CLASS_NAME_MAX_LENGTH} characters."})
+            continue
+        name_key, class_key = _key(first_name, last_name), _key(class_name)
+        if name_key in seen_names:
+            if seen_names[name_key] != class_key:
+                plan['errors'].append({'row': row_number, 'error': f"{first_name} {last_name} is listed in more than one class."})
+            continue  # A repeated row is a no-op.
+        seen_names[name_key] = class_key
+        listed_classes.add(class_key)
+        if class_key not in classes:
+            classes[class_key] = (None, class_name)
+            plan['new_classes'].append(class_name)
+        class_id = classes[class_key][0]
+
+        matches = existing.get(name_key, [])
+        same_class = [pk for pk, current_class_id, _, _ in matches if class_id is not None and current_class_id == class_id]
+        if same_class:
+            seen_students.add(same_class[0])
+            plan['unchanged'] += 1
+        elif not matches:
+            plan['create'].append({'row': row_number, 'first_name': first_name, 'last_name': last_name, 'class': class_name})
+        elif len(matches) == 1:
+            pk, current_class_id, _, _ = matches[0]
+            seen_students.add(pk)
+            plan['move'].append({'row': row_number, 'id': pk, 'first_name': first_name, 'last_name': last_name,
+                                 'from_class_id': current_class_id, 'from': class_names.get(current_class_id), 'class': class_name})
+        else:
+            plan['errors'].append({'row': row_number, 'error': f"More than one {first_name} {last_name} exists in other classes; move them by hand."})
+
+    if sync:
+        plan['missing'] = [
+            {'id': pk, 'first_name': first_name, 'last_name': last_name, 'class': class_names[class_id]}
+            for matches in existing.values() for pk, class_id, first_name, last_name in matches
+            if pk not in seen_students and _key(class_names[class_id]) in listed_classes
+        ]
+    return plan, classes
+
+
+@transaction.atomic
+def apply_plan(plan, classes):
+    new_classes = BiologyClass.objects.bulk_create([BiologyClass(name=name) for name in plan['new_classes']])
+    for biology_class in new_classes:
+        classes[_key(biology_class.name)] = (biology_class.pk, biology_class.name)
+
+    def class_id(name):
+        return classes[_key(name)][0]
+
+    created = Student.objects.bulk_create([
+        Student(first_name=row['first_name'], last_name=row['last_name'], biology_class_id=class_id(row['class']))
+        for row in plan['create']
+    ], batch_size=BATCH_SIZE)
+    moved = [Student(pk=row['id'], biology_class_id=class_id(row['class'])) for row in plan['move']]
+    Student.objects.bulk_update(moved, ['biology_class'], batch_size=BATCH_SIZE)
+
+    # Bulk writes skip the change-log signals. Moves are logged under the class left as well,
+    # as the signals do, so a client following only that class sees the student go.
+    log_changes('student', [(student.pk, student.biology_class_id) for student in created + moved]
+                + [(row['id'], row['from_class_id']) for row in plan['move']])
+    # Moved students change the rankings of the classes they left and joined.
+    if moved:
+        rankings.invalidate_classes({row['from_class_id'] for row in plan['move']} | {student.biology_class_id for student in moved})
+
+
+def import_roster(rows, dry_run=False, sync=False):
+    # Returns the diff; unless this is a dry run, the creates and moves are applied too.
+    # Rows with errors are skipped and reported, and the rest of the file is still imported.
+    plan, classes = plan_import(rows, sync=sync)
+    if not dry_run:
+        apply_plan(plan, classes)
+    return {
+        'dry_run': dry_run,
+        'sync': sync,
+        'summary': {
+            'rows': len(rows),
+            'new_classes': len(plan['new_classes']),
+            'created': len(plan['create']),
+            'moved': len(plan['move']),
+            'unchanged': plan['unchanged'],
+            'missing': len(plan['missing']),
+            'errors': len(plan['errors']),
+        },
+        'new_classes': plan['new_classes'],
+        'created': plan['create'],
+        'moved': [{key: value for key, value in row.items() if key != 'from_class_id'} for row in plan['move']],
+        'missing': plan['missing'],
+        'errors': plan['errors'],
+    }
@@ -0,0 +1,180 @@
+# biology_app/scheduler.py
+# A small in-project scheduler for periodic precompute jobs, so we need neither Celery
+# nor Redis. Run it as `python manage.py run_scheduler`, or set RUN_SCHEDULER_IN_PROCESS
+# to run it as a thread in each web worker. Either way, a file lock elects a single
+# leader per host, so every task runs only once per interval.
+import fcntl
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ScheduledTaskRun
+
+TASKS = {}
+
+
+def periodic(name, every):
+    # Registers a task to run every `every` seconds (overridable in SCHEDULER_INTERVALS).
+    def register(func):
+        TASKS[name] = (func, every)
+        return func
+    return register
+
+
+def interval(name):
+    return settings.SCHEDULER_INTERVALS.get(name, TASKS[name][1])
+
+
+def run_task(name):
+    func, _ = TASKS[name]
+    run = ScheduledTaskRun.objects.create(task=name, started_at=timezone.now())
+    started = time.perf_counter()
+    try:
+        func()
+        run.succeeded = True
+    except Exception as e:
+        print(f"Scheduled task {name} failed: {e}")
+        run.error = str(e)
+    run.finished_at = timezone.now()
+    run.duration_ms = int((time.perf_counter() - started) * 1000)
+    run.save()
+    return run
+
+
+def due_tasks(now=None):
+    now = now or timezone.now()
+    last_runs = dict(ScheduledTaskRun.objects.values('task').annotate(last=Max('started_at')).values_list('task', 'last'))
+    return [name for name in TASKS if name not in last_runs or now - last_runs[name] >= timedelta(seconds=interval(name))]
+
+
+def run_pending():
+    for name in due_tasks():
+        run_task(name)
+
+
+class LeaderLock:
+    # Non-blocking exclusive lock on a file. The OS releases it if the process dies.
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def acquire(self):
+        if self.handle:
+            return True
+        handle = open(self.path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self.handle = handle
+        return True
+
+    def release(self):
+        if self.handle:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+
+
+def run_forever(stop_event=None, tick=None):
+    stop_event = stop_event or threading.Event()
+    tick = tick or settings.SCHEDULER_TICK_SECONDS
+    lock = LeaderLock(settings.SCHEDULER_LOCK_FILE)
+    try:
+        while not stop_event.is_set():
+            # Followers keep retrying, so one of them takes over if the leader exits.
+            if lock.acquire():
+                close_old_connections()
+                try:
+                    run_pending()
+                except Exception as e:
+                    # e.g. "database is locked" while reading or recording runs. The next
+                    # tick retries; a dead loop would never run anything again.
+                    print(f"Scheduler tick failed: {e}")
+                finally:
+                    close_old_connections()
+            stop_event.wait(tick)
+    finally:
+        lock.release()
+
+
+_thread = None
+
+
+def start_in_background():
+    # Called from the WSGI/ASGI entry points when RUN_SCHEDULER_IN_PROCESS is set.
+    global _thread
+    if _thread is None:
+        _thread = threading.Thread(target=run_forever, name='scheduler', daemon=True)
+        _thread.start()
+    return _thread
+
+
+# --- Registered tasks ---
+
+@periodic('warm_dashboard', every=600)
+def warm_dashboard():
+    from . import rollups
+    rollups.dashboard()
+
+
+@periodic('warm_class_details', every=600)
+def warm_class_details():
+    from . import rollups
+    from .models import BiologyClass
+    for biology_class in BiologyClass.objects.all():
+        rollups.class_details(biology_class)
+
+
+@periodic('rebuild_coverage', every=6 * 3600)
+def rebuild_coverage():
+    # Picks up admin edits, which bypass the API's coverage hooks.
+    from .coverage import refresh_coverage
+    from .models import BiologyClass
+    for class_id in BiologyClass.objects.values_list('id', flat=True):
+        refresh_coverage(class_id)
+
+
+@periodic('evaluate_alerts', every=6 * 3600)
+def evaluate_alerts():
+    from .alerts import evaluate_class
+    from .models import BiologyClass
+    for class_id in BiologyClass.objects.values_list('id', flat=True):
+        evaluate_class(class_id)
+
+
+@periodic('reset_rankings', every=24 * 3600)
+def reset_rankings():
+    # Picks up admin edits; the indexes are rebuilt on their next read.
+    from .models import RankingIndex
+    RankingIndex.objects.all().delete()
+
+
+@periodic('compact_change_log', every=24 * 3600)
+def compact_change_log():
+    from .changes import compact_changes
+    compact_changes(settings.CHANGE_LOG_RETENTION_DAYS)
+
+
+@periodic('purge_report_packs', every=24 * 3600)
+def purge_report_packs():
+    # Report pack archives are only kept for a day.
+    from .models import ReportJob
+    ReportJob.objects.filter(created_at__lt=timezone.now() - timedelta(days=1), archive__isnull=False).update(archive=None)
+
+
+@periodic('fail_stale_report_packs', every=300)
+def fail_stale_report_packs():
+    from .reports import fail_stale_report_packs
+    fail_stale_report_packs()
+
+
+@periodic('trim_task_history', every=24 * 3600)
+def trim_task_history():
+    ScheduledTaskRun.objects.filter(started_at__lt=timezone.now() - timedelta(days=settings.SCHEDULER_HISTORY_DAYS)).delete()
@@ -1,12 +1,17 @@
 # biology_app/serializers.py
 
+from django.db import transaction
 from rest_framework import serializers
-from .models import BiologyClass, Student, Test, Question, Standard, Comment, Score
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.reverse import reverse
+from .models import BiologyClass, Student, Test, Question, Standard, Comment, Score, ReportJob, StudentAlert
+from .catalogue import get_standards_catalogue
+from .authoring import write_questions
 
 class BiologyClassSerializer(serializers.ModelSerializer):
     class Meta:
         model = BiologyClass
-        fields = ['id', 'name', 'description']
+        fields = ['id', 'name', 'description', 'level']
 
 class StudentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,9 +24,39 @@ class StandardSerializer(serializers.ModelSerializer):
         model = Standard
         fields = '__all__'
 
+# --- Standard id fields backed by the in-memory catalogue (no query per id) ---
+class CatalogueStandardField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data, catalogue=None):
+        catalogue = catalogue or get_standards_catalogue()
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in catalogue:
+            self.fail('does_not_exist', pk_value=data)
+        return catalogue.instance(pk)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        child_relation = cls(*args, **{key: value for key, value in kwargs.items() if key not in MANY_RELATION_KWARGS})
+        list_kwargs = {key: value for key, value in kwargs.items() if key in MANY_RELATION_KWARGS}
+        return CatalogueStandardListField(child_relation=child_relation, **list_kwargs)
+
+class CatalogueStandardListField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        # Resolve the catalogue once for the whole list.
+        catalogue = get_standards_catalogue()
+        return [self.child_relation.to_internal_value(item, catalogue=catalogue) for item in data]
+
 # --- Question Serializer ---
 class QuestionSerializer(serializers.ModelSerializer):
-    standards = serializers.PrimaryKeyRelatedField(queryset=Standard.objects.all(), many=True)
+    standards = CatalogueStandardField(queryset=Standard.objects.all(), many=True)
     
     class Meta:
         model = Question
@@ -41,6 +76,87 @@ class TestSerializer(serializers.ModelSerializer):
         model = Test
         fields = ['id', 'title', 'date_administered', 'assigned_class', 'questions', 'test_file_link']
 
+# --- Nested test authoring (a test and all its questions in one payload) ---
+class StandardReferenceField(serializers.Field):
+    # Accepts a standard id (int) or a standard code (str); codes are resolved by the parent.
+    default_error_messages = {'invalid': 'Expected a standard id or code.'}
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            self.fail('invalid')
+        return data
+
+    def to_representation(self, value):
+        return value
+
+class AuthoredQuestionSerializer(serializers.Serializer):
+    question_number = serializers.IntegerField(min_value=0)
+    question_text = serializers.CharField(max_length=255)
+    max_mark = serializers.IntegerField(min_value=0)
+    standards = serializers.ListField(child=StandardReferenceField(), allow_empty=True)
+
+class TestAuthoringSerializer(serializers.ModelSerializer):
+    # Optional level used to tell apart codes that exist in more than one level.
+    level = serializers.ChoiceField(choices=Standard.LEVEL_CHOICES, required=False, write_only=True)
+    questions = AuthoredQuestionSerializer(many=True)
+
+    class Meta:
+        model = Test
+        fields = ['id', 'title', 'date_administered', 'assigned_class', 'test_file_link', 'level', 'questions']
+
+    def validate(self, attrs):
+        catalogue = get_standards_catalogue()
+        level = attrs.pop('level', None)
+        numbers = [question['question_number'] for question in attrs['questions']]
+        if len(numbers) != len(set(numbers)):
+            raise serializers.ValidationError({'questions': 'Question numbers must be unique.'})
+        errors = {}
+        for question in attrs['questions']:
+            standard_ids = []
+            for reference in question.pop('standards'):
+                if isinstance(reference, int):
+                    if reference in catalogue:
+                        standard_ids.append(reference)
+                        continue
+                    errors.setdefault(question['question_number'], []).append(f'Unknown standard id {reference}.')
+                    continue
+                matches = [row for row in catalogue.by_code.get(reference.strip(), []) if level is None or row['level'] == level]
+                if len(matches) == 1:
+                    standard_ids.append(matches[0]['id'])
+                elif not matches:
+                    errors.setdefault(question['question_number'], []).append(f'Unknown standard code "{reference}".')
+                else:
+                    errors.setdefault(question['question_number'], []).append(f'Standard code "{reference}" exists in several levels; send "level" too.')
+            question['standard_ids'] = standard_ids
+        if errors:
+            raise serializers.ValidationError({'questions': {f'Q{number}': messages for number, messages in errors.items()}})
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        questions = validated_data.pop('questions')
+        test = Test.objects.create(**validated_data)
+        write_questions(test, questions)
+        return test
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        questions = validated_data.pop('questions')
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
+        write_questions(instance, questions)
+        return instance
+
+    def to_representation(self, instance):
+        test = Test.all_objects.prefetch_related('questions__standards').get(pk=instance.pk)
+        return TestSerializer(test).data
+
+class TestCloneSerializer(serializers.Serializer):
+    assigned_class = serializers.PrimaryKeyRelatedField(queryset=BiologyClass.objects.all())
+    title = serializers.CharField(max_length=200, required=False)
+    date_administered = serializers.DateField(required=False)
+
 # --- Comment Serializer ---
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -60,4 +176,27 @@ class ScoreSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Score
-        fields = ['student', 'question', 'mark_awarded']
\ No newline at end of file
+        fields = ['student', 'question', 'mark_awarded']
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'biology_class', 'status', 'include_pdf', 'progress', 'total', 'error', 'created_at', 'finished_at', 'download_url']
+
+    def get_download_url(self, job):
+        if job.status != 'done':
+            return None
+        return reverse('reportjob-download', args=[job.pk], request=self.context.get('request'))
+
+
+class StudentAlertSerializer(serializers.ModelSerializer):
+    first_name = serializers.ReadOnlyField(source='student.first_name')
+    last_name = serializers.ReadOnlyField(source='student.last_name')
+    biology_class = serializers.ReadOnlyField(source='student.biology_class_id')
+
+    class Meta:
+        model = StudentAlert
+        fields = ['id', 'student', 'first_name', 'last_name', 'biology_class', 'rule', 'standard', 'test',
+                  'value', 'message', 'is_active', 'raised_at', 'updated_at', 'cleared_at']
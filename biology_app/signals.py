@@ -0,0 +1,60 @@
+# biology_app/signals.py
+# Connected in BiologyAppConfig.ready().
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import rankings
+from .alerts import evaluate_students
+from .authentication import invalidate_user_tokens
+from .changes import SYNCED_MODELS, log_change, stored_class_id
+from .models import Question, Score, Student, Test
+
+
+# --- Cached token authentication ---
+# Logout deletes the token; password changes and deactivation save the user.
+@receiver([post_save, post_delete], sender=Token)
+def drop_cached_token(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def drop_cached_user_tokens(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.pk)
+
+
+# --- Change log for delta sync ---
+# Students, tests and questions can move to another class, so their stored class is read
+# before they are saved.
+MOVABLE_MODELS = [Student, Test, Question]
+
+
+def remember_class(sender, instance, raw=False, **kwargs):
+    instance._previous_class_id = stored_class_id(instance) if instance.pk and not raw else None
+
+
+def log_saved(sender, instance, **kwargs):
+    archived = isinstance(instance, Test) and instance.is_archived
+    log_change(instance, 'archive' if archived else 'upsert', getattr(instance, '_previous_class_id', None))
+
+
+# Deletes are logged by the code that deletes (see changes.log_deletes), not by signals.
+for model in SYNCED_MODELS.values():
+    post_save.connect(log_saved, sender=model, dispatch_uid=f'changelog-save-{model._meta.model_name}')
+for model in MOVABLE_MODELS:
+    pre_save.connect(remember_class, sender=model, dispatch_uid=f'changelog-class-{model._meta.model_name}')
+
+
+# --- Rankings and alerts ---
+# Bulk score entry updates both itself (bulk writes send no signals); this covers single
+# saves, such as the admin's.
+@receiver(post_save, sender=Score)
+def rescore_student(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    student_id = instance.student_id
+    test_id = Question.objects.filter(pk=instance.question_id).values_list('test_id', flat=True).first()
+    transaction.on_commit(lambda: evaluate_students({student_id}))
+    transaction.on_commit(lambda: rankings.update_students({student_id}, [test_id]))
@@ -1,3 +1,158 @@
-from django.test import TestCase
+import json
+import time
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db.models import Max
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import providers
+from .ai_context import estimate_tokens
+from .changes import compact_changes
+from .models import BiologyClass, ChangeLogEntry, Comment, Question, Score, Standard, Student, Test
+
+
+class FakeGenerativeModel:
+    # Stands in for Gemini and records the prompts it is sent.
+    prompts = []
+
+    def __init__(self, name):
+        self.name = name
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return type('Response', (), {'text': 'A generated summary.'})()
+
+
+class AIContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        biology_class = BiologyClass.objects.create(name='Year 12 Biology')
+        cls.student = Student.objects.create(first_name='Ada', last_name='Lovelace', biology_class=biology_class)
+        test = Test.objects.create(title='Cells', date_administered=date(2026, 9, 1), assigned_class=biology_class)
+        for number in range(1, 11):
+            standard = Standard.objects.create(level='AS', chapter='Cells', unit=f'Unit {number}', code=f'1.{number}',
+                                               description=f'Standard {number} ' + 'description ' * 10)
+            question = Question.objects.create(test=test, question_number=number, question_text=f'Q{number}', max_mark=4)
+            question.standards.add(standard)
+            Score.objects.create(student=cls.student, question=question, mark_awarded=number % 5)
+        for number in range(5):
+            Comment.objects.create(student=cls.student, text=f'Comment {number}: ' + 'steady progress, ' * 10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='teacher'))
+        FakeGenerativeModel.prompts = []
+        fake_genai = type('FakeGenai', (), {'GenerativeModel': FakeGenerativeModel})
+        patcher = mock.patch.object(providers, 'genai', return_value=fake_genai)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_summary(self, payload):
+        body = json.dumps(payload, default=str)
+        response = self.client.post('/api/students/generate_summary/', body, content_type='application/json')
+        return response, len(body) + len(response.content)
+
+    def test_one_step_request_sends_fewer_bytes_than_two_step_flow(self):
+        # The old flow fetched the performance payload and posted it all back.
+        performance = self.client.get(f'/api/students/{self.student.pk}/performance/')
+        two_step, two_step_bytes = self.post_summary(dict(performance.data))
+        one_step, one_step_bytes = self.post_summary({'student_id': self.student.pk})
+
+        self.assertEqual(two_step.status_code, 200)
+        self.assertEqual(one_step.status_code, 200)
+        self.assertLess(one_step_bytes, len(performance.content) + two_step_bytes)
+        # Both flows build the same prompt, since both read the student from the database.
+        self.assertEqual(FakeGenerativeModel.prompts[0], FakeGenerativeModel.prompts[1])
+
+    def test_one_step_request_is_faster_than_two_step_flow(self):
+        # Both flows build the prompt on the server; the old one also fetched the performance
+        # payload first. Totals over a few runs keep the comparison stable.
+        def timed(flow, runs=5):
+            started = time.perf_counter()
+            for _ in range(runs):
+                flow()
+            return time.perf_counter() - started
+
+        def two_step():
+            performance = self.client.get(f'/api/students/{self.student.pk}/performance/')
+            self.post_summary(dict(performance.data))
+
+        self.assertLess(timed(lambda: self.post_summary({'student_id': self.student.pk})), timed(two_step))
+
+    @override_settings(AI_PROMPT_TOKEN_BUDGET=400)
+    def test_whole_prompt_fits_the_token_budget(self):
+        response, _ = self.post_summary({'student_id': self.student.pk})
+
+        self.assertEqual(response.status_code, 200)
+        prompt = FakeGenerativeModel.prompts[-1]
+        self.assertLessEqual(estimate_tokens(prompt), 400)
+        # The template alone is a few hundred tokens, so only some of the 10 standards fit.
+        self.assertIn('**Instructions:**', prompt)
+        self.assertIn('% mastery', prompt)
+        self.assertLess(prompt.count('% mastery'), 10)
+
+    def test_prompt_is_built_from_database(self):
+        forged = {
+            'student_info': {'id': self.student.pk, 'first_name': 'Forged', 'last_name': 'Name'},
+            'standards_performance': [{'code': '9.9', 'unit': 'Forged unit', 'percentage': 100}],
+            'comments': [{'text': 'Forged comment'}],
+        }
+        response, _ = self.post_summary(forged)
+
+        self.assertEqual(response.status_code, 200)
+        prompt = FakeGenerativeModel.prompts[-1]
+        self.assertIn('Ada Lovelace', prompt)
+        self.assertIn('- 1.4 (Unit 4): 100% mastery', prompt)
+        self.assertIn('- 1.5 (Unit 5): 0% mastery', prompt)
+        self.assertIn('Comment 4: steady progress', prompt)
+        self.assertNotIn('Forged', prompt)
+
+    def test_non_numeric_student_id_is_rejected(self):
+        response, _ = self.post_summary({'student_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='teacher'))
+        self.class_a = BiologyClass.objects.create(name='Class A')
+        self.class_b = BiologyClass.objects.create(name='Class B')
+        self.since = ChangeLogEntry.objects.aggregate(latest=Max('seq'))['latest'] or 0
+
+    def feed(self, biology_class):
+        response = self.client.get('/api/changes/', {'since': self.since, 'class': biology_class.pk})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def move_student(self):
+        student = Student.objects.create(first_name='Ada', last_name='Lovelace', biology_class=self.class_a)
+        response = self.client.patch(f'/api/students/{student.pk}/', {'biology_class': self.class_b.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return student
+
+    def test_moved_row_reaches_both_classes(self):
+        student = self.move_student()
+        for biology_class in (self.class_a, self.class_b):
+            changes = self.feed(biology_class)['changes']
+            self.assertEqual([(change['model'], change['id']) for change in changes], [('student', student.pk)])
+            self.assertEqual(changes[0]['data']['biology_class'], self.class_b.pk)
+
+    def test_compaction_keeps_the_move_out_of_the_old_class(self):
+        student = self.move_student()
+        superseded, trimmed = compact_changes(retention_days=30)
+
+        # The create in class A is superseded by the move; the move stays under both classes.
+        self.assertEqual((superseded, trimmed), (1, 0))
+        data = self.feed(self.class_a)
+        self.assertFalse(data['reset'])
+        self.assertEqual([change['id'] for change in data['changes']], [student.pk])
+        self.assertEqual(data['changes'][0]['data']['biology_class'], self.class_b.pk)
+        self.assertEqual([change['id'] for change in self.feed(self.class_b)['changes']], [student.pk])
+
+    def test_non_numeric_class_is_rejected(self):
+        response = self.client.get('/api/changes/', {'class': 'abc'})
+        self.assertEqual(response.status_code, 400)
@@ -4,7 +4,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 # --- Import the new ViewSets ---
 from .views import (BiologyClassViewSet, StudentViewSet, CommentViewSet, TestViewSet, 
-                    QuestionViewSet, StandardViewSet, dashboard_stats)
+                    QuestionViewSet, StandardViewSet, ReportJobViewSet, StudentAlertViewSet,
+                    dashboard_stats, changes)
 
 router = DefaultRouter()
 router.register(r'classes', BiologyClassViewSet, basename='biologyclass')
@@ -14,8 +15,11 @@ router.register(r'comments', CommentViewSet, basename='comment')
 router.register(r'tests', TestViewSet, basename='test')
 router.register(r'questions', QuestionViewSet, basename='question')
 router.register(r'standards', StandardViewSet, basename='standard')
+router.register(r'report-packs', ReportJobViewSet, basename='reportjob')
+router.register(r'alerts', StudentAlertViewSet, basename='alert')
 
 urlpatterns = [
     path('dashboard-stats/', dashboard_stats, name='dashboard-stats'),
+    path('changes/', changes, name='changes'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
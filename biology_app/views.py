@@ -1,72 +1,130 @@
 # biology_app/views.py
+import io
 
 from rest_framework import viewsets, serializers, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Avg, Count, Q, F, Case, When, FloatField, Sum
+from django.db.models import Count, Max
 from django.db import transaction
+from django.http import FileResponse
 from django.conf import settings
-import google.generativeai as genai
 
-from .models import BiologyClass, Student, Test, Question, Standard, Comment, Score
+from .models import BiologyClass, Student, Test, Question, Standard, Comment, Score, ReportJob, StudentAlert, ChangeLogEntry, StandardCoverage
+from .catalogue import get_standards_catalogue, bump_standards_catalogue
 from .serializers import (
     BiologyClassSerializer, StudentSerializer, TestSerializer, 
     QuestionSerializer, StandardSerializer, CommentSerializer, 
-    StudentDetailSerializer, ScoreSerializer, TestListSerializer
+    StudentDetailSerializer, ScoreSerializer, TestListSerializer,
+    TestAuthoringSerializer, TestCloneSerializer, ReportJobSerializer,
+    StudentAlertSerializer
 )
+from .authoring import clone_test
+from . import providers, rankings, rollups
+from .renderers import json_response
+from .roster import import_roster, read_roster
+from .reports import fail_stale_report_packs, start_report_pack
+from .alerts import evaluate_students, evaluate_class
+from .changes import log_changes, log_class_deletes, log_deletes, get_horizon
+from .coverage import refresh_coverage, test_standard_ids
+from .ai_context import build_prompt, comment_prompt, student_mastery, summary_prompt
 
 class BiologyClassViewSet(viewsets.ModelViewSet):
     queryset = BiologyClass.objects.all()
     serializer_class = BiologyClassSerializer
 
+    def perform_update(self, serializer):
+        old_level = serializer.instance.level
+        super().perform_update(serializer)
+        # A new level moves the class to another cohort.
+        if old_level != serializer.instance.level:
+            rankings.invalidate_cohort(old_level, serializer.instance.pk)
+            rankings.invalidate_cohort(serializer.instance.level, serializer.instance.pk)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        log_class_deletes([instance.pk])
+        super().perform_destroy(instance)
+
     @action(detail=True, methods=['get'])
     def details(self, request, pk=None):
         biology_class = self.get_object()
-        latest_test = Test.objects.filter(assigned_class=biology_class).order_by('-date_administered').first()
-        students_in_class = Student.objects.filter(biology_class=biology_class).order_by('first_name', 'last_name')
-        student_serializer = StudentDetailSerializer(students_in_class, many=True)
-        if not latest_test:
-            return Response({
-                'class_info': BiologyClassSerializer(biology_class).data,
-                'students': student_serializer.data,
-                'summary': { "message": "No tests found for this class." }
-            })
-        active_test_filter = Q(score__question__test__is_archived=False)
-
-        students_performance = Student.objects.filter(
-            biology_class=biology_class
-        ).annotate(
-            total_awarded=Sum('score__mark_awarded', filter=Q(score__question__test=latest_test) & (active_test_filter)),
-            total_possible=Sum('score__question__max_mark', filter=Q(score__question__test=latest_test)&(active_test_filter)),
-            percentage=Case(When(total_possible__gt=0, then=(F('total_awarded') * 100.0) / F('total_possible')), default=0.0, output_field=FloatField())
-        ).order_by('-percentage')
-        average_data = students_performance.aggregate(avg_percent=Avg('percentage'))
-        average_score_percentage = round(average_data['avg_percent'] or 0, 2)
-        red_flag_count = students_performance.filter(percentage__lt=70).count()
-        bins = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
-        labels = [f"{bins[i]}-{bins[i+1]}%" for i in range(len(bins)-1)]
-        histogram_counts = {label: 0 for label in labels}
-        for student in students_performance:
-            percentage = student.percentage
-            for i in range(len(bins) - 1):
-                if bins[i] <= percentage < bins[i+1] or (i == len(bins) - 2 and percentage == 100):
-                    histogram_counts[labels[i]] += 1
-                    break
-        histogram_data = {'labels': list(histogram_counts.keys()), 'data': list(histogram_counts.values())}
-        summary_payload = {
-            "latest_test_title": latest_test.title,
-            "test_file_link": latest_test.test_file_link,
-            "average_score_percentage": average_score_percentage,
-            "red_flag_count": red_flag_count,
-            "histogram_data": histogram_data
+        # Students and summary come from the rollup cache (see biology_app/rollups.py),
+        # which already holds plain dicts, so they are encoded directly.
+        response_data = {'class_info': BiologyClassSerializer(biology_class).data, **rollups.class_details(biology_class)}
+        return json_response(response_data)
+
+    # --- Coverage: how much the class has been assessed on each standard ---
+    @action(detail=True, methods=['get'])
+    def coverage(self, request, pk=None):
+        biology_class = self.get_object()
+        catalogue = get_standards_catalogue()
+        covered = {
+            row['standard_id']: row for row in
+            StandardCoverage.objects.filter(biology_class=biology_class)
+            .values('standard_id', 'assessment_count', 'total_marks', 'last_assessed')
         }
-        response_data = {
+        # Never-assessed standards are listed for the levels this class is taught (or ?level=).
+        levels = request.query_params.getlist('level') or sorted({catalogue.by_id[pk]['level'] for pk in covered if pk in catalogue})
+        chapters = []
+        for standard in catalogue.rows:
+            if standard['level'] not in levels:
+                continue
+            if not chapters or (chapters[-1]['level'], chapters[-1]['chapter']) != (standard['level'], standard['chapter']):
+                chapters.append({'level': standard['level'], 'chapter': standard['chapter'], 'units': []})
+            units = chapters[-1]['units']
+            if not units or units[-1]['unit'] != standard['unit']:
+                units.append({'unit': standard['unit'], 'standards': []})
+            row = covered.get(standard['id'], {})
+            units[-1]['standards'].append({
+                'id': standard['id'],
+                'code': standard['code'],
+                'description': standard['description'],
+                'assessment_count': row.get('assessment_count', 0),
+                'total_marks': row.get('total_marks', 0),
+                'last_assessed': row.get('last_assessed'),
+            })
+        listed = [standard for chapter in chapters for unit in chapter['units'] for standard in unit['standards']]
+        return Response({
             'class_info': BiologyClassSerializer(biology_class).data,
-            'students': student_serializer.data,
-            'summary': summary_payload
-        }
-        return Response(response_data)
+            'summary': {
+                'assessed': sum(1 for standard in listed if standard['assessment_count']),
+                'never_assessed': sum(1 for standard in listed if not standard['assessment_count']),
+            },
+            'chapters': chapters,
+        })
+
+    # --- Report pack: starts a background job that renders every student's report ---
+    @action(detail=True, methods=['post'], url_path='report-pack')
+    def report_pack(self, request, pk=None):
+        biology_class = self.get_object()
+        include_pdf = str(request.data.get('pdf', '')).lower() in ('1', 'true')
+        job = start_report_pack(biology_class, include_pdf=include_pdf)
+        return Response(ReportJobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+class ReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    # Poll a job for progress, then download its ZIP once it is done.
+    # The archive is only loaded by the download action.
+    queryset = ReportJob.objects.defer('archive').order_by('-created_at')
+    serializer_class = ReportJobSerializer
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['=biology_class__id']
+
+    def retrieve(self, request, *args, **kwargs):
+        # Clients poll a job until it finishes, so one whose worker died is failed here.
+        fail_stale_report_packs()
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'done':
+            return Response({'error': 'The report pack is not ready yet.'}, status=status.HTTP_409_CONFLICT)
+        if job.archive is None:
+            return Response({'error': 'The report pack has expired. Please generate it again.'}, status=status.HTTP_410_GONE)
+        filename = f"report-pack-{job.biology_class.name}-{job.created_at:%Y-%m-%d}.zip"
+        return FileResponse(io.BytesIO(job.archive), as_attachment=True, filename=filename, content_type='application/zip')
 
 class StudentViewSet(viewsets.ModelViewSet):
     queryset = Student.objects.all().order_by('first_name','last_name')
@@ -74,61 +132,74 @@ class StudentViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['=biology_class__id']
 
+    # A student moving class (or leaving) changes the rankings of both classes.
+    def perform_update(self, serializer):
+        old_class_id = serializer.instance.biology_class_id
+        super().perform_update(serializer)
+        if old_class_id != serializer.instance.biology_class_id:
+            rankings.invalidate_class(old_class_id)
+            rankings.invalidate_class(serializer.instance.biology_class_id)
+
+    def perform_destroy(self, instance):
+        class_id = instance.biology_class_id
+        with transaction.atomic():
+            log_deletes(Student.objects.filter(pk=instance.pk))
+            super().perform_destroy(instance)
+        rankings.invalidate_class(class_id)
+
+    # --- Roster import: a CSV/XLSX of names and classes; ?dry_run=true only returns the diff ---
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            return Response({'error': 'Please upload a .csv or .xlsx file.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = read_roster(uploaded_file, uploaded_file.name)
+        except Exception as e:
+            # Unreadable spreadsheets raise whatever pandas/openpyxl raise, as in the admin upload.
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        result = import_roster(
+            rows,
+            dry_run=str(request.data.get('dry_run', request.query_params.get('dry_run'))).lower() == 'true',
+            sync=str(request.data.get('sync', request.query_params.get('sync'))).lower() == 'true',
+        )
+        return Response(result)
+
     @action(detail=True, methods=['get'])
     def performance(self, request, pk=None):
         student = self.get_object()
         comments = student.comments.order_by('-created_at')
         comment_serializer = CommentSerializer(comments, many=True)
-        standards_performance = Standard.objects.filter(questions__score__student=student, questions__test__is_archived=False).distinct().annotate(total_awarded=Sum('questions__score__mark_awarded', filter=Q(questions__score__student=student, questions__test__is_archived=False)), total_possible=Sum('questions__max_mark', filter=Q(questions__score__student=student)), percentage=Case(When(total_possible__gt=0, then=(F('total_awarded') * 100.0) / F('total_possible')), default=0.0, output_field=FloatField())).values('id', 'unit', 'code', 'description', 'percentage')
-        response_data = {'student_info': StudentDetailSerializer(student).data, 'comments': comment_serializer.data, 'standards_performance': list(standards_performance)}
+        standards_performance = student_mastery(student)
+        response_data = {'student_info': StudentDetailSerializer(student).data, 'comments': comment_serializer.data, 'standards_performance': list(standards_performance),
+                         'ranking': rankings.student_positions(student)}
         return Response(response_data)
 
+    def _student_for_ai(self, request):
+        # Only the id is taken from the client; the prompt data is read from the database.
+        # Older clients send the whole performance blob, so fall back to its student id.
+        student_info = request.data.get('student_info')
+        student_id = request.data.get('student_id') or (student_info.get('id') if isinstance(student_info, dict) else None)
+        if not student_id:
+            return None
+        try:
+            student_id = int(student_id)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError({'error': 'student_id must be a number.'})
+        return Student.objects.filter(pk=student_id).first()
+
+    def _generate_text(self, prompt):
+        model = providers.genai().GenerativeModel('gemini-1.5-flash-latest')
+        return model.generate_content(prompt).text
+
     @action(detail=False, methods=['post'])
     def generate_summary(self, request):
-        student_info = request.data.get('student_info', {})
-        standards_performance = request.data.get('standards_performance', [])
-        comments = request.data.get('comments', [])
-        if not student_info:
+        student = self._student_for_ai(request)
+        if not student:
             return Response({'error': 'Missing student data.'}, status=status.HTTP_400_BAD_REQUEST)
-        prompt = f"""
-        You are an expert, insightful, and encouraging high school biology teaching assistant.
-        Your task is to provide a diagnostic summary for a teacher about a student's performance.
-        The summary should be structured, clear, and provide actionable suggestions.
-
-        **Student:** {student_info.get('first_name')} {student_info.get('last_name')}
-
-        **Quantitative Data (Mastery on Standards):**
-        """
-        if standards_performance:
-            for standard in standards_performance:
-                prompt += f"- {standard.get('code')} ({standard.get('unit')}): {round(standard.get('percentage', 0))}% mastery\n"
-        else:
-            prompt += "- No quantitative performance data available.\n"
-        prompt += "\n**Qualitative Data (Teacher's Comments):**\n"
-        if comments:
-            for comment in comments:
-                prompt += f"- {comment.get('text')}\n"
-        else:
-            prompt += "- No teacher comments available.\n"
-        prompt += """
-        **Instructions:**
-        Based on all the data above, generate a diagnostic report with the following three sections.
-        Use markdown for formatting (bold headings).
-
-        **1. Areas of Strength:**
-        Identify 1-2 key units or concepts where the student is demonstrating strong understanding (high scores). Be specific.
-
-        **2. Areas for Improvement:**
-        Identify 1-2 specific units or concepts where the student is struggling (low scores). If there are relevant teacher comments, connect them to the quantitative data.
-
-        **3. Suggested Next Steps:**
-        Provide 2-3 concrete, actionable suggestions for the teacher to help this student. These could include targeted review activities, different teaching strategies, or specific topics to revisit.
-        """
+        prompt = build_prompt(student, summary_prompt)
         try:
-            genai.configure(api_key=settings.GOOGLE_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            response = model.generate_content(prompt)
-            summary_text = response.text
+            summary_text = self._generate_text(prompt)
             return Response({'summary': summary_text})
         except Exception as e:
             print(f"Google AI API error: {e}")
@@ -136,36 +207,12 @@ class StudentViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def generate_comment(self, request):
-        student_info = request.data.get('student_info', {})
-        standards_performance = request.data.get('standards_performance', [])
-        if not student_info:
+        student = self._student_for_ai(request)
+        if not student:
             return Response({'error': 'Missing student data.'}, status=status.HTTP_400_BAD_REQUEST)
-        prompt = f"""
-        You are a professional and encouraging high school biology teacher.
-        Your task is to write a 3-sentence report card comment for a student.
-
-        **Student Name:** {student_info.get('first_name')} {student_info.get('last_name')}
-
-        **Performance Data (Mastery on Standards):**
-        """
-        if standards_performance:
-            for standard in standards_performance:
-                prompt += f"- {standard.get('code')} ({standard.get('unit')}): {round(standard.get('percentage', 0))}% mastery\n"
-        else:
-            prompt += "- No performance data available.\n"
-        prompt += """
-        **Instructions:**
-        Based on the data, write a 3-sentence comment with the following structure:
-        1. Start with a general, positive description of the student's engagement or progress.
-        2. Mention one specific area of strength (a high-scoring unit or concept) and one specific area for improvement (a low-scoring unit or concept), referencing the competency code if possible.
-        3. End with an encouraging remark about their potential or next steps.
-        The tone must be professional, supportive, and concise.
-        """
+        prompt = build_prompt(student, comment_prompt, include_comments=False)
         try:
-            genai.configure(api_key=settings.GOOGLE_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            response = model.generate_content(prompt)
-            comment_text = response.text.strip()
+            comment_text = self._generate_text(prompt).strip()
             return Response({'comment': comment_text})
         except Exception as e:
             print(f"Google AI API error: {e}")
@@ -175,6 +222,11 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        log_deletes(Comment.objects.filter(pk=instance.pk))
+        super().perform_destroy(instance)
+
 class TestViewSet(viewsets.ModelViewSet):
     # The default queryset now correctly uses our custom manager to hide archived tests
     queryset = Test.objects.all() 
@@ -195,9 +247,21 @@ class TestViewSet(viewsets.ModelViewSet):
         return TestSerializer
 
     # --- OVERRIDE: This now "archives" instead of deleting ---
+    def perform_update(self, serializer):
+        old_class_id = serializer.instance.assigned_class_id
+        super().perform_update(serializer)
+        # A new date or class changes which test is latest and when standards were last assessed.
+        for class_id in {old_class_id, serializer.instance.assigned_class_id}:
+            refresh_coverage(class_id)
+            evaluate_class(class_id)
+            rankings.invalidate_class(class_id)
+
     def perform_destroy(self, instance):
         instance.is_archived = True
         instance.save()
+        evaluate_class(instance.assigned_class_id)
+        rankings.invalidate_class(instance.assigned_class_id)
+        refresh_coverage(instance.assigned_class_id, test_standard_ids(instance))
 
     # --- NEW: Action to restore an archived test ---
     @action(detail=True, methods=['post'])
@@ -206,61 +270,245 @@ class TestViewSet(viewsets.ModelViewSet):
         test = Test.all_objects.get(pk=pk)
         test.is_archived = False
         test.save()
+        evaluate_class(test.assigned_class_id)
+        rankings.invalidate_class(test.assigned_class_id)
+        refresh_coverage(test.assigned_class_id, test_standard_ids(test))
         return Response({'status': 'Test restored'})
 
+    # --- Nested authoring: a whole test with its questions and standards in one request ---
+    @action(detail=False, methods=['post'], url_path='nested', url_name='nested-create')
+    def nested_create(self, request):
+        serializer = TestAuthoringSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        test = serializer.save()
+        refresh_coverage(test.assigned_class_id, test_standard_ids(test))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    # Replaces the test's questions; questions are matched by number so their scores are kept.
+    @action(detail=True, methods=['put'], url_path='nested', url_name='nested-replace')
+    def nested_replace(self, request, pk=None):
+        test = self.get_object()
+        old_class_id, old_standard_ids = test.assigned_class_id, test_standard_ids(test)
+        serializer = TestAuthoringSerializer(test, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        evaluate_class(test.assigned_class_id)
+        rankings.invalidate_class(test.assigned_class_id)
+        if old_class_id != test.assigned_class_id:
+            refresh_coverage(old_class_id, old_standard_ids)
+            old_standard_ids = set()
+        refresh_coverage(test.assigned_class_id, old_standard_ids | test_standard_ids(test))
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        source = self.get_object()
+        serializer = TestCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        clone = clone_test(source, **serializer.validated_data)
+        refresh_coverage(clone.assigned_class_id, test_standard_ids(clone))
+        return Response(TestAuthoringSerializer(clone).data, status=status.HTTP_201_CREATED)
+
     # ... (bulk_score_entry and scores actions are unchanged) ...
     @action(detail=True, methods=['post'])
     @transaction.atomic
     def bulk_score_entry(self, request, pk=None):
         scores_data = request.data.get('scores', {})
+        marks = {}
         for student_id, question_scores in scores_data.items():
             for question_id, mark in question_scores.items():
                 if mark is not None and mark != '':
-                    Score.objects.update_or_create(student_id=student_id, question_id=question_id, defaults={'mark_awarded': int(mark)})
+                    marks[(int(student_id), int(question_id))] = int(mark)
+        # One read and two bulk writes instead of an update_or_create per cell.
+        # Unchanged cells are not written (or logged for delta sync).
+        changed, seen = [], set()
+        existing_scores = Score.objects.filter(student_id__in={key[0] for key in marks}, question_id__in={key[1] for key in marks})
+        for score in existing_scores:
+            key = (score.student_id, score.question_id)
+            if key in marks:
+                seen.add(key)
+                if score.mark_awarded != marks[key]:
+                    score.mark_awarded = marks[key]
+                    changed.append(score)
+        Score.objects.bulk_update(changed, ['mark_awarded'])
+        changed += Score.objects.bulk_create([
+            Score(student_id=student_id, question_id=question_id, mark_awarded=mark)
+            for (student_id, question_id), mark in marks.items() if (student_id, question_id) not in seen
+        ])
+        if changed:
+            class_of_student = dict(Student.objects.filter(pk__in={score.student_id for score in changed}).values_list('id', 'biology_class_id'))
+            log_changes('score', [(score.pk, class_of_student.get(score.student_id)) for score in changed])
+        # Only the students in this save are re-checked, once the scores are committed.
+        student_ids = {int(student_id) for student_id in scores_data}
+        transaction.on_commit(lambda: evaluate_students(student_ids))
+        transaction.on_commit(lambda: rankings.update_students(student_ids, [int(pk)]))
         return Response({'status': 'Scores updated successfully'}, status=status.HTTP_200_OK)
+    # --- Ranking: ?k= students at the top and bottom, and optionally one ?student= ---
+    @action(detail=True, methods=['get'])
+    def ranking(self, request, pk=None):
+        test = self.get_object()
+        try:
+            k = min(max(int(request.query_params.get('k', 10)), 0), 100)
+            student_id = int(request.query_params['student']) if request.query_params.get('student') else None
+        except ValueError:
+            return Response({'error': 'k and student must be numbers.'}, status=status.HTTP_400_BAD_REQUEST)
+        ranking = rankings.test_ranking(test.pk)
+        return Response({
+            'test_id': test.pk,
+            'count': len(ranking),
+            'top': rankings.ranked_students(ranking.top(k)),
+            'bottom': rankings.ranked_students(ranking.bottom(k)),
+            'student': ranking.position(student_id) if student_id is not None else None,
+        })
+
     @action(detail=True, methods=['get'])
     def scores(self, request, pk=None):
         test = self.get_object()
-        existing_scores = Score.objects.filter(question__test=test)
-        serializer = ScoreSerializer(existing_scores, many=True)
-        return Response(serializer.data)
+        # The grid can be thousands of cells: values() rows are encoded directly, with no serializer pass.
+        existing_scores = Score.objects.filter(question__test=test).values('student', 'question', 'mark_awarded')
+        return json_response(list(existing_scores))
 
 class QuestionViewSet(viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        question = serializer.instance
+        refresh_coverage(question.test.assigned_class_id, [standard.pk for standard in question.standards.all()])
+
+    # Changing a question's marks (or removing it) changes every percentage in the class.
+    def perform_update(self, serializer):
+        question = serializer.instance
+        old_class_id = question.test.assigned_class_id
+        old_standard_ids = set(question.standards.values_list('id', flat=True))
+        super().perform_update(serializer)
+        new_class_id = Test.all_objects.filter(pk=question.test_id).values_list('assigned_class_id', flat=True).get()
+        new_standard_ids = set(question.standards.values_list('id', flat=True))
+        evaluate_class(new_class_id)
+        rankings.invalidate_class(new_class_id)
+        if old_class_id != new_class_id:
+            evaluate_class(old_class_id)
+            rankings.invalidate_class(old_class_id)
+            refresh_coverage(old_class_id, old_standard_ids)
+            old_standard_ids = set()
+        refresh_coverage(new_class_id, old_standard_ids | new_standard_ids)
+
+    def perform_destroy(self, instance):
+        class_id = instance.test.assigned_class_id
+        standard_ids = set(instance.standards.values_list('id', flat=True))
+        with transaction.atomic():
+            log_deletes(Question.objects.filter(pk=instance.pk))
+            super().perform_destroy(instance)
+        evaluate_class(class_id)
+        rankings.invalidate_class(class_id)
+        refresh_coverage(class_id, standard_ids)
+
 class StandardViewSet(viewsets.ModelViewSet):
-    queryset = Standard.objects.all().order_by('code')
+    queryset = Standard.objects.all()
     serializer_class = StandardSerializer
 
+    # The list is served from the per-worker catalogue, with an ETag so that
+    # unchanged syllabuses come back as an empty 304.
+    def list(self, request, *args, **kwargs):
+        catalogue = get_standards_catalogue()
+        if_none_match = request.headers.get('If-None-Match', '')
+        client_etags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        if catalogue.etag in client_etags or if_none_match.strip() == '*':
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = json_response(catalogue.content)
+        response['ETag'] = catalogue.etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        bump_standards_catalogue()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        bump_standards_catalogue()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        bump_standards_catalogue()
+
+class StudentAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    # Current at-risk flags, kept up to date by biology_app/alerts.py.
+    serializer_class = StudentAlertSerializer
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['=student__biology_class__id']
+
+    def get_queryset(self):
+        alerts = StudentAlert.objects.select_related('student')
+        # Cleared alerts are the history; only show them when asked.
+        if self.request.query_params.get('include_cleared') == 'true':
+            return alerts.all()
+        return alerts.filter(is_active=True)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
-    all_classes = BiologyClass.objects.all().order_by('name')
-    class_averages = []
-    for bio_class in all_classes:
-        latest_test = Test.objects.filter(assigned_class=bio_class).order_by('-date_administered').first()
-        if latest_test:
-            avg_data = Score.objects.filter(
-                question__test=latest_test, question__test__is_archived=False
-            ).aggregate(
-                avg_percent=Avg(
-                    (F('mark_awarded') * 100.0) / F('question__max_mark'),
-                    output_field=FloatField()
-                )
-            )
-            average_score = round(avg_data.get('avg_percent') or 0, 1)
-        else:
-            average_score = 0
-        class_averages.append({
-            'class_name': bio_class.name,
-            'average_score': average_score
-        })
-    chart_data = {
-        'labels': [item['class_name'] for item in class_averages],
-        'data': [item['average_score'] for item in class_averages]
-    }
-    response_data = {
-        'class_performance_chart': chart_data
-    }
-    return Response(response_data)
\ No newline at end of file
+    return Response(rollups.dashboard())
+
+# --- Delta sync: what changed since the client's last seq ---
+CHANGE_FEED_SOURCES = {
+    'score': (Score.objects.select_related('student', 'question'), ScoreSerializer),
+    'student': (Student.objects.all(), StudentSerializer),
+    'test': (Test.all_objects.all(), TestListSerializer),
+    'question': (Question.objects.prefetch_related('standards'), QuestionSerializer),
+    'comment': (Comment.objects.all(), CommentSerializer),
+}
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def changes(request):
+    try:
+        since = int(request.query_params.get('since', 0))
+        class_id = int(request.query_params['class']) if request.query_params.get('class') else None
+    except ValueError:
+        return Response({'error': 'since and class must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+    horizon = get_horizon()
+    # The log can be empty after a trim, so never report a seq below the horizon.
+    latest_seq = max(ChangeLogEntry.objects.aggregate(latest=Max('seq'))['latest'] or 0, horizon)
+    # Entries the client needs have been trimmed, so it must refetch everything.
+    if since < horizon:
+        return Response({'reset': True, 'seq': latest_seq, 'has_more': False, 'changes': []})
+
+    entries = ChangeLogEntry.objects.filter(seq__gt=since).order_by('seq')
+    if class_id is not None:
+        entries = entries.filter(biology_class_id=class_id)
+    limit = settings.CHANGE_FEED_PAGE_SIZE
+    page = list(entries[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    # Compact: only the newest entry per row matters.
+    newest = {}
+    for entry in page:
+        newest.pop((entry.model, entry.object_id), None)
+        newest[(entry.model, entry.object_id)] = entry
+
+    # One query per model for the current state of every upserted row.
+    current = {}
+    for model, (queryset, serializer_class) in CHANGE_FEED_SOURCES.items():
+        ids = [object_id for (entry_model, object_id), entry in newest.items() if entry_model == model and entry.action != 'delete']
+        if ids:
+            current[model] = {row.pk: serializer_class(row).data for row in queryset.filter(pk__in=ids)}
+
+    changes_payload = []
+    for (model, object_id), entry in newest.items():
+        data = current.get(model, {}).get(object_id)
+        action = entry.action
+        if action != 'delete' and data is None:
+            action, data = 'delete', None  # Gone since it was logged.
+        changes_payload.append({'seq': entry.seq, 'model': model, 'id': object_id, 'action': action,
+                                'data': data if action != 'delete' else entry.data})
+    return Response({
+        'reset': False,
+        # When this was the last page, the client is up to date with the whole log.
+        'seq': page[-1].seq if has_more else max(since, latest_seq),
+        'has_more': has_more,
+        'changes': changes_payload,
+    })
\ No newline at end of file
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard_project.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.RUN_SCHEDULER_IN_PROCESS:
+    from biology_app.scheduler import start_in_background
+    start_in_background()
@@ -1,5 +1,6 @@
 # dashboard_project/settings.py
 import os
+import tempfile
 import dj_database_url
 from pathlib import Path
 from dotenv import load_dotenv
@@ -58,6 +59,8 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     # WhiteNoise middleware is for serving static files in production.
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Compresses API responses (gzip, or brotli when installed); see biology_app/middleware.py.
+    'biology_app.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -118,6 +121,16 @@ CORS_ALLOWED_ORIGINS.extend([origin for origin in CORS_PROD_ORIGINS if origin])
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY', '')
 
+# Heavy libraries (see biology_app/providers.py) are imported on first use.
+# List them here, e.g. PRELOAD_PROVIDERS="genai,pandas", to import them when the app starts instead.
+PRELOAD_PROVIDERS = [name for name in os.environ.get('PRELOAD_PROVIDERS', '').split(',') if name]
+
+# The AI endpoints build their prompts from the database (see biology_app/ai_context.py).
+# Each whole prompt, template text included, is trimmed to fit this many (estimated) tokens.
+AI_PROMPT_TOKEN_BUDGET = 1500
+# Only this many of a student's most recent comments are considered.
+AI_CONTEXT_MAX_COMMENTS = 20
+
 
 # settings.py (at the bottom)
 
@@ -127,10 +140,98 @@ SITE_ID = 1
 # dj-rest-auth configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication with the token -> user lookup cached (see biology_app/authentication.py).
+        'biology_app.authentication.CachedTokenAuthentication',
+    ],
+    # orjson-backed JSON (with a stdlib fallback when orjson is not installed); see biology_app/renderers.py.
+    'DEFAULT_RENDERER_CLASSES': [
+        'biology_app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'biology_app.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+# --- RESPONSE COMPRESSION ---
+# Smaller responses are sent as they are; compressing them costs more than it saves.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'text/')
+# Brotli quality 4 compresses better than gzip at a similar CPU cost (11 is for static assets).
+COMPRESSION_BROTLI_QUALITY = 4
+# Responses under these paths carry tokens, so they only get gzip, which has BREACH padding.
+COMPRESSION_GZIP_ONLY_PATHS = ('/api/auth/',)
+
 # Disable email verification for now to keep it simple
 ACCOUNT_EMAIL_VERIFICATION = 'none'
-ACCOUNT_EMAIL_REQUIRED = False
\ No newline at end of file
+ACCOUNT_EMAIL_REQUIRED = False
+
+# --- CACHES ---
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Dashboard and class details rollups (biology_app/rollups.py), kept in the database so
+    # every worker and instance shares them. The table is created by migration 0014.
+    'rollups': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'biology_rollup_cache',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+ROLLUP_CACHE = 'rollups'
+# Rollups are versioned by the change log, so this only bounds how long unused ones are kept.
+ROLLUP_CACHE_TTL = 24 * 3600
+
+# --- IN-PROCESS CACHES ---
+# How often (in seconds) each worker re-checks the standards catalogue version stamp.
+STANDARDS_CATALOGUE_RECHECK_SECONDS = 5
+# Token -> user lookups (biology_app/authentication.py): each worker keeps up to this many,
+# dropping the least recently used first, and trusts one for at most TOKEN_AUTH_CACHE_TTL seconds.
+TOKEN_AUTH_CACHE_SIZE = 5000
+TOKEN_AUTH_CACHE_TTL = 300
+# How often (in seconds) a cached lookup re-checks the user's version stamp, which logout,
+# password changes and deactivation bump for every instance. 0 checks it on every request.
+TOKEN_AUTH_RECHECK_SECONDS = 2
+
+# --- REPORT PACKS ---
+# Per-student PDF reports are rendered in a pool of this many processes.
+REPORT_PACK_WORKERS = int(os.environ.get('REPORT_PACK_WORKERS', min(4, os.cpu_count() or 1)))
+# Smaller classes (and HTML-only packs) are rendered in the job thread; a pool is not worth starting.
+REPORT_PACK_POOL_THRESHOLD = 40
+# How many of each student's latest comments go into their report.
+REPORT_PACK_COMMENTS = 3
+# A running job that has not saved progress for this many seconds is assumed dead and marked failed.
+REPORT_PACK_STALE_SECONDS = 600
+
+# --- AT-RISK ALERTS ---
+# Rules used by biology_app/alerts.py to flag students after their scores change.
+AT_RISK_RULES = {
+    # Flag a student whose latest test is below this percentage.
+    'LATEST_TEST_THRESHOLD': 70,
+    # Flag a student whose last TREND_TESTS tests each fell, by TREND_MIN_DROP points in total.
+    'TREND_TESTS': 3,
+    'TREND_MIN_DROP': 10,
+    # Flag each standard below this mastery percentage, once it has been assessed on STANDARD_MIN_MARKS marks.
+    'STANDARD_MASTERY_FLOOR': 50,
+    'STANDARD_MIN_MARKS': 4,
+}
+
+# --- DELTA SYNC (/api/changes/) ---
+# Most change-log entries returned per request.
+CHANGE_FEED_PAGE_SIZE = 1000
+# `manage.py compact_changes` trims entries older than this.
+CHANGE_LOG_RETENTION_DAYS = 30
+
+# --- SCHEDULER ---
+# Periodic precompute tasks (biology_app/scheduler.py). Run `manage.py run_scheduler`,
+# or set RUN_SCHEDULER_IN_PROCESS=true to start the scheduler inside each web worker.
+RUN_SCHEDULER_IN_PROCESS = os.environ.get('RUN_SCHEDULER_IN_PROCESS', 'false') == 'true'
+# Only the process holding this lock runs tasks; the others wait to take over.
+SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'biology_scheduler.lock'))
+SCHEDULER_TICK_SECONDS = 30
+# Per-task interval overrides in seconds, e.g. {'warm_dashboard': 300}.
+SCHEDULER_INTERVALS = {}
+SCHEDULER_HISTORY_DAYS = 14